@@ -1,12 +1,34 @@
-import json
-from typing import Any, Dict
+import asyncio
+from typing import Any, Dict, List, Optional
 
-from backend.core.base_agent import BaseAgent
+from backend.core.base_agent import BaseAgent, compile_section_re, looks_like_json
+from backend.schemas.agent_output_schemas import ContentSchema
+from pydantic import ValidationError
+
+# Section labels of a text response and the content field and parser for each
+LABEL_DISPATCH = {
+    "Content": ("content", BaseAgent._split_bullets),
+    "Examples": ("examples", BaseAgent._split_bullets),
+    "Visual Suggestions": ("visual_suggestions", BaseAgent._split_bullets),
+    "Interactive Elements": ("interactive_elements", BaseAgent._split_bullets),
+}
+SECTION_RE = compile_section_re(list(LABEL_DISPATCH))
 
 
 class ContentGeneratorAgent(BaseAgent):
     """Agent responsible for generating educational content"""
 
+    prompt_version = "2"
+    output_schema = ContentSchema
+    section_re = SECTION_RE
+    section_dispatch = LABEL_DISPATCH
+    required_fields = [
+        "content",
+        "examples",
+        "visual_suggestions",
+        "interactive_elements",
+    ]
+
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate educational content for a module section
@@ -27,89 +49,97 @@ class ContentGeneratorAgent(BaseAgent):
                 - interactive_elements: Suggested interactive components
         """
         try:
-            # Format the prompt with input data
-            messages = self._format_prompt(input_data)
-
-            # Execute the LLM
-            response = await self._execute_llm(messages)
-
-            # Parse the response
-            content = self._parse_response(response)
-
-            # Validate the output
-            if not self._validate_output(content):
-                raise ValueError("Invalid content output")
+            # Generate the content, reusing a cached result for identical input
+            content = await self._generate(input_data)
 
             # Send results to quiz generator
             await self.send_message(
                 "quiz_generator", {"type": "content", "data": content}
             )
+            await self.flush_outbox()
 
-            return {
-                "status": "success",
-                "agent": self.config.name,
-                "content": content,
-            }
+            return self._finalize_result(content=content)
 
         except Exception as e:
             return await self._handle_error(e)
 
+    async def process_batch(self, inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Generate educational content for several module sections at once
+
+        Args:
+            inputs: List of input dictionaries as accepted by process()
+
+        Returns:
+            List of results in the same order as the inputs
+        """
+        try:
+            # Sections not already cached go to the LLM concurrently; a
+            # section that fails comes back as its exception
+            contents = await self._generate_batch(inputs)
+
+            # Send results to quiz generator
+            await asyncio.gather(
+                *(
+                    self.send_message(
+                        "quiz_generator", {"type": "content", "data": content}
+                    )
+                    for content in contents
+                    if not isinstance(content, Exception)
+                )
+            )
+            await self.flush_outbox()
+
+            return [
+                (
+                    await self._handle_error(content)
+                    if isinstance(content, Exception)
+                    else self._finalize_result(content=content)
+                )
+                for content in contents
+            ]
+
+        except Exception as e:
+            error = await self._handle_error(e)
+            # A separate dict per input, so changing one result leaves the
+            # others alone
+            return [dict(error) for _ in inputs]
+
+    def _semantic_scope(self, input_data: Dict[str, Any]) -> Any:
+        """Only reuse content built from the same other prompt inputs"""
+        # The whole input is the prompt, so audience, duration, difficulty and
+        # any plan must match exactly; only the matched text may vary
+        return {
+            key: value
+            for key, value in input_data.items()
+            if key not in ("topic", "learning_objectives")
+        }
+
+    def _semantic_text(self, input_data: Dict[str, Any]) -> Optional[str]:
+        """Match near-duplicate requests on the topic and learning objectives"""
+        topic = input_data.get("topic")
+        if not topic:
+            return None
+        objectives = input_data.get("learning_objectives") or []
+        return "\n".join([str(topic), *map(str, objectives)])
+
     def _parse_response(self, response: str) -> Dict[str, Any]:
         """Parse the LLM response into structured data"""
-        try:
-            # Attempt to parse as JSON
-            return json.loads(response)
-        except json.JSONDecodeError:
-            # If not JSON, try to extract structured data from text
-            sections = response.split("\n\n")
-            content = {
-                "content": [],
-                "examples": [],
-                "visual_suggestions": [],
-                "interactive_elements": [],
-            }
-
-            current_section = None
-            for section in sections:
-                if section.startswith("Content:"):
-                    current_section = "content"
-                    content["content"] = [
-                        c.strip()
-                        for c in section.replace("Content:", "").split("\n")
-                        if c.strip()
-                    ]
-                elif section.startswith("Examples:"):
-                    current_section = "examples"
-                    content["examples"] = [
-                        e.strip()
-                        for e in section.replace("Examples:", "").split("\n")
-                        if e.strip()
-                    ]
-                elif section.startswith("Visual Suggestions:"):
-                    current_section = "visual_suggestions"
-                    content["visual_suggestions"] = [
-                        v.strip()
-                        for v in section.replace("Visual Suggestions:", "").split("\n")
-                        if v.strip()
-                    ]
-                elif section.startswith("Interactive Elements:"):
-                    current_section = "interactive_elements"
-                    content["interactive_elements"] = [
-                        i.strip()
-                        for i in section.replace("Interactive Elements:", "").split(
-                            "\n"
-                        )
-                        if i.strip()
-                    ]
-
-            return content
-
-    def _validate_output(self, output: Dict[str, Any]) -> bool:
-        """Validate the content output"""
-        required_fields = [
-            "content",
-            "examples",
-            "visual_suggestions",
-            "interactive_elements",
-        ]
-        return all(field in output for field in required_fields)
+        if looks_like_json(response):
+            try:
+                # Structured output mode returns JSON matching the schema
+                return ContentSchema.model_validate_json(response).model_dump()
+            except ValidationError:
+                pass
+
+        # Providers without JSON schema support may still answer in text
+        content = {
+            "content": [],
+            "examples": [],
+            "visual_suggestions": [],
+            "interactive_elements": [],
+        }
+
+        # Capture every labelled section in a single pass
+        content.update(self._require_sections(response))
+        return content
@@ -1,23 +1,88 @@
-import json
 import logging
-from datetime import datetime
-from typing import Any, Dict, List
+from functools import lru_cache
+from string import Template
+from typing import Any, Dict, List, Optional
 
 from backend.app.core.config import settings
 from backend.app.services.model_service import get_active_model
-from backend.core.base_agent import AgentConfig, BaseAgent
+from backend.core.base_agent import (
+    AgentConfig,
+    BaseAgent,
+    compile_section_re,
+    looks_like_json,
+)
+from backend.schemas.agent_output_schemas import AnalysisSchema
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
+from pydantic import ValidationError
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+
+SYSTEM_PROMPT = "You are an expert educational content analyzer."
+ANALYSIS_PROMPT = Template(
+    """You are an expert educational content analyzer. Your task is to analyze the provided $document_type document and create a detailed outline of its content.
+
+Please analyze the following document and provide:
+1. Main topics and their hierarchy
+2. Key concepts and their relationships
+3. Content complexity assessment
+4. Suggested module structure
+5. Prerequisites and dependencies
+
+Document Content:
+$document_text
+
+Additional Context:
+$context
+
+Please provide your analysis in a structured format."""
+)
+
+# Prompts are a few KB plus the document, so keep the cache small
+PROMPT_CACHE_SIZE = 32
+
+
+@lru_cache(maxsize=PROMPT_CACHE_SIZE)
+def _build_prompt(document_type: str, document_text: str, context: str) -> str:
+    """Fill the analysis prompt, reusing the result for repeated documents"""
+    return ANALYSIS_PROMPT.substitute(
+        document_type=document_type,
+        document_text=document_text,
+        context=context,
+    )
+
+
+# Section labels of a text response and the analysis field and parser for each
+LABEL_DISPATCH = {
+    "Topics": ("topics", BaseAgent._split_bullets),
+    "Main Topics": ("topics", BaseAgent._split_bullets),
+    "Key Concepts": ("key_concepts", BaseAgent._split_bullets),
+    "Complexity": ("complexity", str.strip),
+    "Suggested Structure": ("suggested_structure", str.strip),
+    "Structure": ("suggested_structure", str.strip),
+    "Prerequisites": ("prerequisites", BaseAgent._split_bullets),
+    "Dependencies": ("dependencies", BaseAgent._split_bullets),
+}
+SECTION_RE = compile_section_re(list(LABEL_DISPATCH))
 
 
 class DocumentAnalyzerAgent(BaseAgent):
     """Agent responsible for analyzing educational documents"""
 
+    prompt_version = "2"
+    output_schema = AnalysisSchema
+    section_re = SECTION_RE
+    section_dispatch = LABEL_DISPATCH
+    required_fields = [
+        "topics",
+        "key_concepts",
+        "complexity",
+        "suggested_structure",
+    ]
+
     def __init__(self, config: Dict[str, Any]):
         """Initialize the agent with configuration"""
         try:
-            logger.debug(f"Initializing DocumentAnalyzerAgent with config: {config}")
+            logger.debug("Initializing DocumentAnalyzerAgent with config: %s", config)
             agent_config = AgentConfig(**config)
             super().__init__(agent_config)
             logger.info("Successfully initialized DocumentAnalyzerAgent")
@@ -61,7 +126,7 @@ class DocumentAnalyzerAgent(BaseAgent):
             if not active_model:
                 logger.error("No active model found in settings")
                 raise ValueError("No active model found")
-            logger.debug(f"Using active model: {active_model['model_name']}")
+            logger.debug("Using active model: %s", active_model["model_name"])
 
             # Update agent config with active model
             logger.debug("Updating agent config with active model settings")
@@ -72,30 +137,14 @@ class DocumentAnalyzerAgent(BaseAgent):
             # Get agent context
             context = input_data.get("agent_context", "")
             if context:
-                logger.info(f"Using agent context: {context}")
+                logger.info("Using agent context: %s", context)
             else:
                 logger.debug("No agent context provided")
 
-            # Format the prompt with input data and context
-            logger.debug("Formatting prompt")
-            messages = self._format_prompt(input_data, context)
-            logger.debug(f"Generated {len(messages)} messages for LLM")
-
-            # Execute the LLM
-            logger.info(f"Executing LLM with model {self.config.model_name}")
-            response = await self._execute_llm(messages)
-            logger.debug(f"Received response of length {len(response)}")
-
-            # Parse the response
-            logger.debug("Parsing LLM response")
-            analysis = self._parse_response(response)
-            logger.debug(f"Parsed analysis contains {len(analysis)} fields")
-
-            # Validate the output
-            logger.debug("Validating analysis output")
-            if not self._validate_output(analysis):
-                logger.error("Invalid analysis output structure")
-                raise ValueError("Invalid analysis output")
+            # Run the analysis, reusing a cached result for identical input
+            logger.info("Executing LLM with model %s", self.config.model_name)
+            analysis = await self._generate(input_data)
+            logger.debug("Parsed analysis contains %d fields", len(analysis))
             logger.info("Analysis output validation successful")
 
             # Send results to module planner
@@ -103,15 +152,12 @@ class DocumentAnalyzerAgent(BaseAgent):
             await self.send_message(
                 "module_planner", {"type": "document_analysis", "data": analysis}
             )
+            await self.flush_outbox()
             logger.debug("Results sent to module planner")
 
-            result = {
-                "status": "success",
-                "agent": self.config.name,
-                "analysis": analysis,
-                "model_used": self.config.model_name,
-                "timestamp": datetime.now().isoformat(),
-            }
+            result = self._finalize_result(
+                analysis=analysis, model_used=self.config.model_name
+            )
             logger.info("Document analysis completed successfully")
             return result
 
@@ -121,150 +167,65 @@ class DocumentAnalyzerAgent(BaseAgent):
             )
             return await self._handle_error(e)
 
-    def _format_prompt(
-        self, input_data: Dict[str, Any], context: str = ""
-    ) -> List[Dict[str, str]]:
+    def _format_prompt(self, input_data: Dict[str, Any]) -> List[BaseMessage]:
         """Format the prompt template with input data and context"""
         try:
             document_text = input_data.get("document_text", "")
             document_type = input_data.get("document_type", "")
+            context = input_data.get("agent_context", "")
 
-            logger.debug(f"Formatting prompt for {document_type} document")
-            logger.debug(f"Document text length: {len(document_text)}")
-            logger.debug(f"Context provided: {bool(context)}")
-
-            prompt = f"""You are an expert educational content analyzer. Your task is to analyze the provided {document_type} document and create a detailed outline of its content.
-
-Please analyze the following document and provide:
-1. Main topics and their hierarchy
-2. Key concepts and their relationships
-3. Content complexity assessment
-4. Suggested module structure
-5. Prerequisites and dependencies
-
-Document Content:
-{document_text}
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Formatting prompt for %s document", document_type)
+                logger.debug("Document text length: %d", len(document_text))
+                logger.debug("Context provided: %s", bool(context))
 
-Additional Context:
-{context}
-
-Please provide your analysis in a structured format."""
+            prompt = _build_prompt(document_type, document_text, context)
 
             messages = [
-                {
-                    "role": "system",
-                    "content": "You are an expert educational content analyzer.",
-                },
-                {"role": "user", "content": prompt},
+                SystemMessage(content=SYSTEM_PROMPT),
+                HumanMessage(content=prompt),
             ]
-            logger.debug(f"Generated prompt with {len(prompt)} characters")
+            logger.debug("Generated prompt with %d characters", len(prompt))
             return messages
         except Exception as e:
             logger.error(f"Error formatting prompt: {str(e)}", exc_info=True)
             raise
 
+    def _semantic_scope(self, input_data: Dict[str, Any]) -> Any:
+        """Only reuse analyses of the same document type"""
+        return input_data.get("document_type", "")
+
+    def _semantic_text(self, input_data: Dict[str, Any]) -> Optional[str]:
+        """Match near-duplicate uploads on the document text and context"""
+        document_text = input_data.get("document_text")
+        if not document_text:
+            return None
+        return f"{input_data.get('agent_context', '')}\n{document_text}"
+
     def _parse_response(self, response: str) -> Dict[str, Any]:
         """Parse the LLM response into structured data"""
-        try:
-            logger.debug("Attempting to parse response as JSON")
-            # Try to parse as JSON first
-            return json.loads(response)
-        except json.JSONDecodeError:
-            logger.debug("Response is not JSON, parsing as text")
-            # If not JSON, try to extract structured data from text
-            analysis = {
-                "topics": [],
-                "subtopics": {},
-                "key_concepts": [],
-                "complexity": "",
-                "suggested_structure": "",
-                "prerequisites": [],
-                "dependencies": [],
-            }
-
-            # Split response into sections
-            sections = response.split("\n\n")
-            logger.debug(f"Split response into {len(sections)} sections")
-
-            for section in sections:
-                try:
-                    if "Topics:" in section:
-                        topics = section.split("Topics:")[1].strip().split("\n")
-                        analysis["topics"] = [
-                            t.strip("- ") for t in topics if t.strip()
-                        ]
-                        logger.debug(f"Parsed {len(analysis['topics'])} topics")
-                    elif "Key Concepts:" in section:
-                        concepts = section.split("Key Concepts:")[1].strip().split("\n")
-                        analysis["key_concepts"] = [
-                            c.strip("- ") for c in concepts if c.strip()
-                        ]
-                        logger.debug(
-                            f"Parsed {len(analysis['key_concepts'])} key concepts"
-                        )
-                    elif "Complexity:" in section:
-                        analysis["complexity"] = section.split("Complexity:")[1].strip()
-                        logger.debug("Parsed complexity")
-                    elif "Structure:" in section:
-                        analysis["suggested_structure"] = section.split("Structure:")[
-                            1
-                        ].strip()
-                        logger.debug("Parsed structure")
-                    elif "Prerequisites:" in section:
-                        prereqs = section.split("Prerequisites:")[1].strip().split("\n")
-                        analysis["prerequisites"] = [
-                            p.strip("- ") for p in prereqs if p.strip()
-                        ]
-                        logger.debug(
-                            f"Parsed {len(analysis['prerequisites'])} prerequisites"
-                        )
-                    elif "Dependencies:" in section:
-                        deps = section.split("Dependencies:")[1].strip().split("\n")
-                        analysis["dependencies"] = [
-                            d.strip("- ") for d in deps if d.strip()
-                        ]
-                        logger.debug(
-                            f"Parsed {len(analysis['dependencies'])} dependencies"
-                        )
-                except Exception as e:
-                    logger.error(f"Error parsing section: {str(e)}", exc_info=True)
-
-            return analysis
-
-    def _validate_output(self, output: Dict[str, Any]) -> bool:
-        """Validate the output of the agent"""
-        required_fields = [
-            "topics",
-            "key_concepts",
-            "complexity",
-            "suggested_structure",
-        ]
-
-        logger.debug(f"Validating output fields: {', '.join(required_fields)}")
-
-        # Check if all required fields are present
-        for field in required_fields:
-            if field not in output:
-                logger.error(f"Missing required field: {field}")
-                return False
-
-            # Check if fields have valid values
-            if field in ["topics", "key_concepts"] and not isinstance(
-                output[field], list
-            ):
-                logger.error(f"Field {field} must be a list, got {type(output[field])}")
-                return False
-            elif field in ["complexity", "suggested_structure"] and not isinstance(
-                output[field], str
-            ):
-                logger.error(
-                    f"Field {field} must be a string, got {type(output[field])}"
-                )
-                return False
-
-            # Check if lists have content
-            if field in ["topics", "key_concepts"] and not output[field]:
-                logger.warning(f"Field {field} is empty")
-
-        logger.debug("Output validation successful")
-        return True
+        if looks_like_json(response):
+            try:
+                logger.debug("Attempting to parse response as structured output")
+                # Structured output mode returns JSON matching the schema
+                return AnalysisSchema.model_validate_json(response).model_dump()
+            except ValidationError:
+                pass
+
+        logger.debug("Response does not match the schema, parsing as text")
+        # Providers without JSON schema support may still answer in text
+        analysis = {
+            "topics": [],
+            "subtopics": {},
+            "key_concepts": [],
+            "complexity": "",
+            "suggested_structure": "",
+            "prerequisites": [],
+            "dependencies": [],
+        }
+
+        # Capture every labelled section in a single pass
+        sections = self._require_sections(response)
+        logger.debug("Parsed %s", ", ".join(sections))
+        analysis.update(sections)
+        return analysis
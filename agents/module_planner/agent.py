@@ -1,12 +1,53 @@
-import json
-from typing import Any, Dict
+import asyncio
+from typing import Any, Dict, List
 
-from backend.core.base_agent import BaseAgent
+from backend.core.base_agent import BaseAgent, compile_section_re, looks_like_json
+from backend.schemas.agent_output_schemas import PlanSchema
+from pydantic import ValidationError
+
+
+def _parse_duration(duration_text: str) -> Dict[str, float]:
+    """Parse duration text into a dictionary of section durations"""
+    durations = {}
+    for line in duration_text.split("\n"):
+        if ":" in line:
+            section, duration = line.split(":", 1)
+            try:
+                durations[section.strip()] = float(duration.strip().split()[0])
+            except (ValueError, IndexError):
+                continue
+    return durations
+
+
+def _parse_sections(structure_text: str) -> List[Dict[str, Any]]:
+    """Parse the module structure into section records, without durations yet"""
+    return [{"name": name} for name in BaseAgent._split_bullets(structure_text)]
+
+
+# Section labels of a text response and the plan field and parser for each;
+# durations are merged into the section records once parsing completes
+LABEL_DISPATCH = {
+    "Module Structure": ("sections", _parse_sections),
+    "Prerequisites": ("prerequisites", BaseAgent._split_bullets),
+    "Learning Path": ("learning_path", BaseAgent._split_bullets),
+    "Estimated Duration": ("estimated_duration", _parse_duration),
+}
+SECTION_RE = compile_section_re(list(LABEL_DISPATCH))
 
 
 class ModulePlannerAgent(BaseAgent):
     """Agent responsible for planning the structure of learning modules"""
 
+    prompt_version = "3"
+    output_schema = PlanSchema
+    section_re = SECTION_RE
+    section_dispatch = LABEL_DISPATCH
+    required_fields = [
+        "sections",
+        "prerequisites",
+        "learning_path",
+    ]
+
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Plan the structure of a learning module
@@ -21,103 +62,111 @@ class ModulePlannerAgent(BaseAgent):
 
         Returns:
             Dictionary containing:
-                - module_structure: List of module sections
+                - sections: List of module sections, each with name and duration
                 - prerequisites: List of prerequisites
                 - learning_path: Suggested learning sequence
-                - estimated_duration: Estimated duration per section
         """
+        dispatches = []
+        sent: List[Dict[str, Any]] = []
         try:
-            # Format the prompt with input data
-            messages = self._format_prompt(input_data)
-
-            # Execute the LLM
-            response = await self._execute_llm(messages)
-
-            # Parse the response
-            plan = self._parse_response(response)
-
-            # Validate the output
-            if not self._validate_output(plan):
-                raise ValueError("Invalid module plan output")
-
-            # Send results to content generator
-            await self.send_message(
-                "content_generator", {"type": "module_plan", "data": plan}
+            streamed: Dict[str, Any] = {}
+
+            async def on_field(field: str, payload: Any):
+                # Hand sections to the content generator before the plan
+                # finishes, once their durations are known: JSON records carry
+                # their own, text replies list them in a later section
+                if field not in ("sections", "estimated_duration") or dispatches:
+                    return
+                streamed[field] = payload
+                sections = streamed.get("sections")
+                if sections is None:
+                    return
+                durations = streamed.get("estimated_duration")
+                if durations is not None:
+                    sections = [
+                        {**section, "duration": durations.get(section["name"], 0.0)}
+                        for section in sections
+                    ]
+                elif not all(
+                    {"name", "duration"} <= section.keys() for section in sections
+                ):
+                    return
+                sent.extend(sections)
+                dispatches.append(
+                    asyncio.create_task(self._dispatch_sections(sections, input_data))
+                )
+
+            # Stream the plan, reusing a cached result for identical input
+            plan = await self._generate_streaming(input_data, on_field)
+            await asyncio.gather(*dispatches)
+
+            # A cached plan streams nothing, and a streamed plan that failed
+            # validation is replaced by a retried one; send whatever sections
+            # of the final plan were not already sent as streamed
+            streamed_keys = {(s.get("name"), s.get("duration")) for s in sent}
+            await self._dispatch_sections(
+                [
+                    section
+                    for section in plan["sections"]
+                    if (section["name"], section["duration"]) not in streamed_keys
+                ],
+                input_data,
             )
+            await self.flush_outbox()
 
-            return {
-                "status": "success",
-                "agent": self.config.name,
-                "plan": plan,
-            }
+            return self._finalize_result(plan=plan)
 
         except Exception as e:
+            # Do not leave early section dispatches running unobserved
+            for task in dispatches:
+                task.cancel()
+            await asyncio.gather(*dispatches, return_exceptions=True)
             return await self._handle_error(e)
 
+    async def _dispatch_sections(
+        self, sections: List[Dict[str, Any]], input_data: Dict[str, Any]
+    ):
+        """Send each section to the content generator concurrently"""
+        await asyncio.gather(
+            *(
+                self.send_message(
+                    "content_generator",
+                    {
+                        "type": "module_plan_section",
+                        "data": {
+                            "topic": section["name"],
+                            "duration": section["duration"],
+                            "target_audience": input_data.get("target_audience"),
+                        },
+                    },
+                )
+                for section in sections
+            )
+        )
+
     def _parse_response(self, response: str) -> Dict[str, Any]:
         """Parse the LLM response into structured data"""
-        try:
-            # Attempt to parse as JSON
-            return json.loads(response)
-        except json.JSONDecodeError:
-            # If not JSON, try to extract structured data from text
-            sections = response.split("\n\n")
-            plan = {
-                "module_structure": [],
-                "prerequisites": [],
-                "learning_path": [],
-                "estimated_duration": {},
-            }
-
-            current_section = None
-            for section in sections:
-                if section.startswith("Module Structure:"):
-                    current_section = "module_structure"
-                    plan["module_structure"] = [
-                        s.strip()
-                        for s in section.replace("Module Structure:", "").split("\n")
-                        if s.strip()
-                    ]
-                elif section.startswith("Prerequisites:"):
-                    current_section = "prerequisites"
-                    plan["prerequisites"] = [
-                        p.strip()
-                        for p in section.replace("Prerequisites:", "").split("\n")
-                        if p.strip()
-                    ]
-                elif section.startswith("Learning Path:"):
-                    current_section = "learning_path"
-                    plan["learning_path"] = [
-                        p.strip()
-                        for p in section.replace("Learning Path:", "").split("\n")
-                        if p.strip()
-                    ]
-                elif section.startswith("Estimated Duration:"):
-                    current_section = "estimated_duration"
-                    duration_text = section.replace("Estimated Duration:", "").strip()
-                    # Parse duration text into a dictionary
-                    plan["estimated_duration"] = self._parse_duration(duration_text)
-
-            return plan
-
-    def _parse_duration(self, duration_text: str) -> Dict[str, float]:
-        """Parse duration text into a dictionary of section durations"""
-        durations = {}
-        for line in duration_text.split("\n"):
-            if ":" in line:
-                section, duration = line.split(":", 1)
-                try:
-                    durations[section.strip()] = float(duration.strip().split()[0])
-                except (ValueError, IndexError):
-                    continue
-        return durations
-
-    def _validate_output(self, output: Dict[str, Any]) -> bool:
-        """Validate the module plan output"""
-        required_fields = [
-            "module_structure",
-            "prerequisites",
-            "learning_path",
-            "estimated_duration",
-        ]
-        return all(field in output for field in required_fields)
+        if looks_like_json(response):
+            try:
+                # Structured output mode returns JSON matching the schema
+                return PlanSchema.model_validate_json(response).model_dump()
+            except ValidationError:
+                pass
+
+        # Providers without JSON schema support may still answer in text
+        plan = {
+            "sections": [],
+            "prerequisites": [],
+            "learning_path": [],
+        }
+
+        # Capture every labelled section in a single pass
+        sections = self._require_sections(response)
+        durations = sections.pop("estimated_duration", {})
+        plan.update(sections)
+
+        # Durations are listed separately in text; fold them into the records
+        for section in plan["sections"]:
+            section["duration"] = durations.get(section["name"], 0.0)
+
+        return plan
@@ -1,12 +1,42 @@
-import json
 from typing import Any, Dict
 
-from backend.core.base_agent import BaseAgent
+from backend.core.base_agent import BaseAgent, compile_section_re, looks_like_json
+from backend.schemas.agent_output_schemas import ReviewSchema
+from pydantic import ValidationError
+
+
+def _parse_score(text: str) -> float:
+    """Parse a quality score, treating anything unreadable as 0"""
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+# Section labels of a text response and the review field and parser for each
+LABEL_DISPATCH = {
+    "Status": ("status", lambda text: text.strip().lower()),
+    "Feedback": ("feedback", BaseAgent._split_bullets),
+    "Suggestions": ("suggestions", BaseAgent._split_bullets),
+    "Quality Score": ("quality_score", _parse_score),
+}
+SECTION_RE = compile_section_re(list(LABEL_DISPATCH))
 
 
 class QualityAssuranceAgent(BaseAgent):
     """Agent responsible for reviewing and validating content and quizzes"""
 
+    prompt_version = "2"
+    output_schema = ReviewSchema
+    section_re = SECTION_RE
+    section_dispatch = LABEL_DISPATCH
+    required_fields = [
+        "status",
+        "feedback",
+        "suggestions",
+        "quality_score",
+    ]
+
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Review and validate content or quizzes
@@ -27,72 +57,31 @@ class QualityAssuranceAgent(BaseAgent):
                 - quality_score: Overall quality score (0-100)
         """
         try:
-            # Format the prompt with input data
-            messages = self._format_prompt(input_data)
-
-            # Execute the LLM
-            response = await self._execute_llm(messages)
+            # Generate the review, reusing a cached result for identical input
+            review = await self._generate(input_data)
 
-            # Parse the response
-            review = self._parse_response(response)
-
-            # Validate the output
-            if not self._validate_output(review):
-                raise ValueError("Invalid review output")
-
-            return {
-                "status": "success",
-                "agent": self.config.name,
-                "review": review,
-            }
+            return self._finalize_result(review=review)
 
         except Exception as e:
             return await self._handle_error(e)
 
     def _parse_response(self, response: str) -> Dict[str, Any]:
         """Parse the LLM response into structured data"""
-        try:
-            # Attempt to parse as JSON
-            return json.loads(response)
-        except json.JSONDecodeError:
-            # If not JSON, try to extract structured data from text
-            sections = response.split("\n\n")
-            review = {
-                "status": "needs_revision",
-                "feedback": [],
-                "suggestions": [],
-                "quality_score": 0,
-            }
-
-            for section in sections:
-                if section.startswith("Status:"):
-                    review["status"] = section.replace("Status:", "").strip().lower()
-                elif section.startswith("Feedback:"):
-                    feedback = section.replace("Feedback:", "").strip()
-                    review["feedback"] = [
-                        f.strip() for f in feedback.split("\n") if f.strip()
-                    ]
-                elif section.startswith("Suggestions:"):
-                    suggestions = section.replace("Suggestions:", "").strip()
-                    review["suggestions"] = [
-                        s.strip() for s in suggestions.split("\n") if s.strip()
-                    ]
-                elif section.startswith("Quality Score:"):
-                    try:
-                        review["quality_score"] = float(
-                            section.replace("Quality Score:", "").strip()
-                        )
-                    except (ValueError, IndexError):
-                        review["quality_score"] = 0.0
-
-            return review
-
-    def _validate_output(self, output: Dict[str, Any]) -> bool:
-        """Validate the review output"""
-        required_fields = [
-            "status",
-            "feedback",
-            "suggestions",
-            "quality_score",
-        ]
-        return all(field in output for field in required_fields)
+        if looks_like_json(response):
+            try:
+                # Structured output mode returns JSON matching the schema
+                return ReviewSchema.model_validate_json(response).model_dump()
+            except ValidationError:
+                pass
+
+        # Providers without JSON schema support may still answer in text
+        review = {
+            "status": "needs_revision",
+            "feedback": [],
+            "suggestions": [],
+            "quality_score": 0,
+        }
+
+        # Capture every labelled section in a single pass
+        review.update(self._require_sections(response))
+        return review
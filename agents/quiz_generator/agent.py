@@ -1,12 +1,51 @@
-import json
-from typing import Any, Dict
+import re
+from string import Template
+from typing import Any, Dict, List, Optional
 
-from backend.core.base_agent import BaseAgent
+from backend.core.base_agent import BaseAgent, compile_section_re, looks_like_json
+from backend.schemas.agent_output_schemas import QuizSchema
+from langchain.schema import BaseMessage, HumanMessage
+from pydantic import ValidationError
+
+# Request settings come first and the content last, so repeated requests
+# share as long a prompt prefix as possible
+QUIZ_REQUEST = Template(
+    """Difficulty level: $difficulty_level
+Question types: $question_types
+
+Learning objectives:
+$learning_objectives
+
+Content:
+$content"""
+)
+
+# First number in a difficulty rating, e.g. "3", "4.5/5" or "Level 2"
+DIFFICULTY_RE = re.compile(r"[-+]?\d*\.?\d+")
+
+
+def _parse_difficulty(text: str) -> float:
+    """Parse a difficulty rating, treating anything without a number as 0"""
+    match = DIFFICULTY_RE.search(text)
+    return float(match.group()) if match else 0.0
+
+
+# Labels that annotate the current question, with the item field and parser
+LABEL_DISPATCH = {
+    "Answer": ("answer", str.strip),
+    "Explanation": ("explanation", str.strip),
+    "Difficulty": ("difficulty", _parse_difficulty),
+}
+SECTION_RE = compile_section_re(["Question", *LABEL_DISPATCH])
 
 
 class QuizGeneratorAgent(BaseAgent):
     """Agent responsible for generating assessments and quizzes"""
 
+    prompt_version = "5"
+    output_schema = QuizSchema
+    required_fields = ["items"]
+
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate assessments and quizzes for a module section
@@ -21,82 +60,79 @@ class QuizGeneratorAgent(BaseAgent):
 
         Returns:
             Dictionary containing:
-                - questions: List of generated questions
-                - answers: Dictionary mapping questions to answers
-                - explanations: Dictionary mapping questions to explanations
-                - difficulty_ratings: Dictionary mapping questions to difficulty ratings
+                - items: List of questions, each with its answer, explanation
+                  and difficulty rating
         """
         try:
-            # Format the prompt with input data
-            messages = self._format_prompt(input_data)
-
-            # Execute the LLM
-            response = await self._execute_llm(messages)
-
-            # Parse the response
-            quiz = self._parse_response(response)
-
-            # Validate the output
-            if not self._validate_output(quiz):
-                raise ValueError("Invalid quiz output")
+            # Generate the quiz, reusing a cached result for identical input
+            quiz = await self._generate(input_data)
 
             # Send results to quality assurance
             await self.send_message("quality_assurance", {"type": "quiz", "data": quiz})
+            await self.flush_outbox()
 
-            return {
-                "status": "success",
-                "agent": self.config.name,
-                "quiz": quiz,
-            }
+            return self._finalize_result(quiz=quiz)
 
         except Exception as e:
             return await self._handle_error(e)
 
+    def _format_prompt(self, input_data: Dict[str, Any]) -> List[BaseMessage]:
+        """Format the quiz request from the module-level template"""
+        content = input_data.get("content") or (
+            input_data.get("content_data") or {}
+        ).get("content", "")
+        if isinstance(content, list):
+            content = "\n".join(map(str, content))
+        objectives = input_data.get("learning_objectives") or []
+        prompt = QUIZ_REQUEST.substitute(
+            difficulty_level=input_data.get("difficulty_level", "intermediate"),
+            question_types=", ".join(map(str, input_data.get("question_types") or []))
+            or "any",
+            learning_objectives="\n".join(f"- {o}" for o in objectives) or "- none",
+            content=content,
+        )
+        return [self.system_message, HumanMessage(content=prompt)]
+
+    def _semantic_scope(self, input_data: Dict[str, Any]) -> Any:
+        """Only reuse quizzes built for the same difficulty and question types"""
+        return [input_data.get("difficulty_level"), input_data.get("question_types")]
+
+    def _semantic_text(self, input_data: Dict[str, Any]) -> Optional[str]:
+        """Match near-duplicate requests on the content and learning objectives"""
+        content = input_data.get("content")
+        if not content:
+            return None
+        objectives = input_data.get("learning_objectives") or []
+        return "\n".join([*map(str, objectives), str(content)])
+
     def _parse_response(self, response: str) -> Dict[str, Any]:
         """Parse the LLM response into structured data"""
-        try:
-            # Attempt to parse as JSON
-            return json.loads(response)
-        except json.JSONDecodeError:
-            # If not JSON, try to extract structured data from text
-            sections = response.split("\n\n")
-            quiz = {
-                "questions": [],
-                "answers": {},
-                "explanations": {},
-                "difficulty_ratings": {},
-            }
-
-            current_question = None
-            for section in sections:
-                if section.startswith("Question:"):
-                    current_question = section.replace("Question:", "").strip()
-                    quiz["questions"].append(current_question)
-                elif section.startswith("Answer:") and current_question:
-                    quiz["answers"][current_question] = section.replace(
-                        "Answer:", ""
-                    ).strip()
-                elif section.startswith("Explanation:") and current_question:
-                    quiz["explanations"][current_question] = section.replace(
-                        "Explanation:", ""
-                    ).strip()
-                elif section.startswith("Difficulty:") and current_question:
-                    difficulty = section.replace("Difficulty:", "").strip()
-                    try:
-                        quiz["difficulty_ratings"][current_question] = float(
-                            difficulty.split()[0]
-                        )
-                    except (ValueError, IndexError):
-                        quiz["difficulty_ratings"][current_question] = 0.0
-
-            return quiz
-
-    def _validate_output(self, output: Dict[str, Any]) -> bool:
-        """Validate the quiz output"""
-        required_fields = [
-            "questions",
-            "answers",
-            "explanations",
-            "difficulty_ratings",
-        ]
-        return all(field in output for field in required_fields)
+        if looks_like_json(response):
+            try:
+                # Structured output mode returns JSON matching the schema
+                return QuizSchema.model_validate_json(response).model_dump()
+            except ValidationError:
+                pass
+
+        # Providers without JSON schema support may still answer in text
+        quiz = {"items": []}
+
+        # Walk the labelled sections in order, attaching each to its question
+        current = None
+        for match in SECTION_RE.finditer(response):
+            label, body = match.group(1), match.group(2)
+            if label == "Question":
+                current = {
+                    "question": body.strip(),
+                    "answer": "",
+                    "explanation": "",
+                    "difficulty": 0.0,
+                }
+                quiz["items"].append(current)
+            elif current:
+                field, parse = LABEL_DISPATCH[label]
+                current[field] = parse(body)
+
+        if not quiz["items"]:
+            raise ValueError("no labelled Question sections were found")
+        return quiz
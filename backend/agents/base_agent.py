@@ -1,14 +1,19 @@
-import json
+import asyncio
 import logging
+import weakref
 from abc import ABC, abstractmethod
-from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional
 from uuid import UUID, uuid4
 
-from ..database.redis_config import get_redis_connection, retry_operation
+from ..core.clock import utc_now_iso
+from ..core.json_utils import json_dumps
+from ..database.redis_config import async_retry_operation, get_async_redis_connection
 from ..schemas.message_schemas import AgentResponse, AgentTask
 
+# Tasks finishing sooner than this never publish the PROCESSING state
+PROCESSING_STATE_DELAY = 0.05  # seconds
+
 
 class AgentState(Enum):
     """Enum for agent states."""
@@ -25,6 +30,17 @@ class AgentError(Exception):
     pass
 
 
+def _warn_not_shutdown(agent_type: str, agent_id: str):
+    """Report an agent dropped without an awaited shutdown()."""
+    # Finalizers run at arbitrary GC points, including inside the event loop
+    # and at interpreter exit, so they must not block on Redis; the stale
+    # state is only logged here
+    logging.getLogger(f"agent.{agent_type}").warning(
+        f"Agent {agent_id} was dropped without shutdown(); "
+        "its Redis state was not marked shut down"
+    )
+
+
 class BaseAgent(ABC):
     """Base class for all agents in the system."""
 
@@ -35,40 +51,48 @@ class BaseAgent(ABC):
         max_retries: int = 3,
         retry_delay: int = 1,
     ):
-        self.agent_id = agent_id or str(uuid4())
+        self.agent_id = agent_id or uuid4().hex
         self.config = config or {}
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.state = AgentState.IDLE
-        self.redis = get_redis_connection()
+        self.redis = get_async_redis_connection()
+
+        # Flags agents dropped without an awaited shutdown()
+        self._finalizer = weakref.finalize(
+            self, _warn_not_shutdown, self.__class__.__name__, self.agent_id
+        )
 
         # Set up logging
         self.logger = logging.getLogger(f"agent.{self.__class__.__name__}")
         self.logger.setLevel(logging.INFO)
 
-        # Initialize health metrics
-        self.health_metrics = {
-            "start_time": datetime.utcnow().isoformat(),
-            "tasks_processed": 0,
-            "errors": 0,
-            "last_error": None,
-            "last_success": None,
-        }
-
-        # Initialize state storage
-        self._initialize_state()
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "BaseAgent":
+        """
+        Create an agent and register its state in Redis.
+        Returns:
+            BaseAgent: The initialized agent
+        """
+        agent = cls(*args, **kwargs)
+        await agent._initialize_state()
+        return agent
 
-    def _initialize_state(self):
+    async def _initialize_state(self):
         """Initialize agent state in Redis."""
         state_key = f"agent:{self.agent_id}:state"
-        self.redis.hset(
+        await self.redis.hset(
             state_key,
             mapping={
                 "agent_id": self.agent_id,
                 "agent_type": self.__class__.__name__,
                 "state": self.state.value,
-                "config": json.dumps(self.config),
-                "health_metrics": json.dumps(self.health_metrics),
+                "config": json_dumps(self.config),
+                # Health metrics live in their own fields so counters can be
+                # bumped in place with HINCRBY
+                "start_time": utc_now_iso(),
+                "tasks_processed": 0,
+                "errors": 0,
             },
         )
 
@@ -92,61 +116,84 @@ class BaseAgent(ABC):
             AgentResponse: The response from processing the task
         """
         self.state = AgentState.PROCESSING
-        self._update_state()
+        announce = asyncio.create_task(self._announce_processing())
 
+        counters = {"tasks_processed": 1}
+        metrics = None
         try:
             response = await self.process_task(task)
-            self._update_health_metrics(success=True)
+            metrics = {"last_success": utc_now_iso()}
             return response
         except Exception as e:
-            self._update_health_metrics(success=False, error=str(e))
+            counters["errors"] = 1
+            metrics = {"last_error": str(e), "last_error_time": utc_now_iso()}
             raise AgentError(f"Task processing failed: {str(e)}")
         finally:
+            announce.cancel()
+            # One round trip carries both the final state and the metrics
             self.state = AgentState.IDLE
-            self._update_state()
+            await self._update_state(metrics, counters)
 
-    @retry_operation
-    def _update_state(self):
-        """Update agent state in Redis."""
-        state_key = f"agent:{self.agent_id}:state"
-        self.redis.hset(
-            state_key,
-            mapping={
-                "state": self.state.value,
-                "last_updated": datetime.utcnow().isoformat(),
-                "health_metrics": json.dumps(self.health_metrics),
-            },
-        )
+    async def _announce_processing(self):
+        """Publish the PROCESSING state once a task has run for a while."""
+        await asyncio.sleep(PROCESSING_STATE_DELAY)
+        await self._update_state()
 
-    def _update_health_metrics(self, success: bool, error: Optional[str] = None):
-        """Update agent health metrics."""
-        self.health_metrics["tasks_processed"] += 1
-        if success:
-            self.health_metrics["last_success"] = datetime.utcnow().isoformat()
-        else:
-            self.health_metrics["errors"] += 1
-            self.health_metrics["last_error"] = error
-            self.health_metrics["last_error_time"] = datetime.utcnow().isoformat()
-
-    def get_health_status(self) -> Dict[str, Any]:
+    @async_retry_operation
+    async def _update_state(
+        self,
+        metrics: Optional[Dict[str, str]] = None,
+        counters: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Update agent state in Redis.
+        Args:
+            metrics: Health metric fields to overwrite
+            counters: Health metric counters to increment
+        """
+        state_key = f"agent:{self.agent_id}:state"
+        mapping = {"state": self.state.value, "last_updated": utc_now_iso()}
+        if metrics:
+            mapping.update(metrics)
+        if not counters:
+            await self.redis.hset(state_key, mapping=mapping)
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(state_key, mapping=mapping)
+            for field, amount in counters.items():
+                pipe.hincrby(state_key, field, amount)
+            await pipe.execute()
+
+    async def get_health_status(self) -> Dict[str, Any]:
         """Get current health status of the agent."""
+        state = await self.redis.hgetall(f"agent:{self.agent_id}:state")
+        health_metrics = {
+            "start_time": state.get("start_time"),
+            "tasks_processed": int(state.get("tasks_processed", 0)),
+            "errors": int(state.get("errors", 0)),
+            "last_error": state.get("last_error"),
+            "last_success": state.get("last_success"),
+        }
+        if "last_error_time" in state:
+            health_metrics["last_error_time"] = state["last_error_time"]
         return {
             "agent_id": self.agent_id,
             "agent_type": self.__class__.__name__,
             "state": self.state.value,
-            "health_metrics": self.health_metrics,
+            "health_metrics": health_metrics,
             "config": self.config,
         }
 
     async def shutdown(self):
         """Gracefully shutdown the agent."""
+        self._finalizer.detach()
         self.state = AgentState.SHUTDOWN
-        self._update_state()
+        await self._update_state()
         self.logger.info(f"Agent {self.agent_id} shutting down")
 
-    def __del__(self):
-        """Cleanup when the agent is destroyed."""
-        try:
-            self.shutdown()
-        except Exception as e:
-            self.logger.error(f"Error during agent cleanup: {str(e)}")
+    async def __aenter__(self) -> "BaseAgent":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.shutdown()
@@ -1,29 +1,35 @@
-import json
+import asyncio
 import logging
 import os
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional, Type
+from typing import Any, Dict, Literal, Optional, Tuple, Type
 
-import yaml
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, ValidationError
 
-from ..database.redis_config import get_redis_connection, retry_operation
+from ..core.clock import utc_now_iso
+from ..core.json_utils import json_dumps
+from ..database.redis_config import async_retry_operation, get_async_redis_connection
+
+# Seconds a loaded config is served from memory before re-reading Redis
+CONFIG_CACHE_TTL = 30
+
+# Hash holding every agent's config so they can be read in one round trip
+CONFIG_INDEX_KEY = "agent_configs_index"
 
 
 class AgentConfig(BaseModel):
     """Base configuration model for agents."""
 
-    agent_id: str
-    agent_type: str
+    agent_id: str = Field(min_length=1)
+    agent_type: str = Field(min_length=1)
     enabled: bool = True
     max_retries: int = Field(default=3, ge=1, le=10)
     retry_delay: int = Field(default=1, ge=1, le=60)
     timeout: int = Field(default=3600, ge=60, le=7200)
-    log_level: str = Field(
-        default="INFO", regex="^(DEBUG|INFO|WARNING|ERROR|CRITICAL)$"
-    )
+    log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO"
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -33,8 +39,10 @@ class ConfigManager:
 
     def __init__(self, config_dir: str = "config"):
         self.config_dir = Path(config_dir)
-        self.redis = get_redis_connection()
+        self.redis = get_async_redis_connection()
         self.logger = logging.getLogger("agent.config")
+        self._cache: Dict[str, Tuple[float, AgentConfig]] = {}
+        self._listener: Optional[asyncio.Task] = None
 
         # Create config directory if it doesn't exist
         self.config_dir.mkdir(parents=True, exist_ok=True)
@@ -42,21 +50,59 @@ class ConfigManager:
         # Load environment variables
         load_dotenv()
 
-        # Initialize configuration storage
-        self._initialize_config_storage()
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "ConfigManager":
+        """
+        Create a config manager and initialize its Redis storage.
+        Returns:
+            ConfigManager: The initialized config manager
+        """
+        manager = cls(*args, **kwargs)
+        await manager._initialize_config_storage()
+        manager._listener = asyncio.create_task(manager._listen_for_changes())
+        return manager
+
+    async def close(self):
+        """Stop listening for configuration changes."""
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
 
-    def _initialize_config_storage(self):
+    async def _listen_for_changes(self):
+        """Drop cached configs when any process publishes a change."""
+        pubsub = self.redis.pubsub()
+        await pubsub.psubscribe("config_change:*")
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "pmessage":
+                    agent_type = message["channel"].split(":", 1)[1]
+                    self._cache.pop(agent_type, None)
+        finally:
+            await pubsub.reset()
+
+    def _get_cached(self, agent_type: str) -> Optional[AgentConfig]:
+        """Get a config from the in-process cache if it has not expired."""
+        entry = self._cache.get(agent_type)
+        if entry and time.monotonic() - entry[0] < CONFIG_CACHE_TTL:
+            return entry[1]
+        return None
+
+    def _set_cached(self, agent_type: str, config: AgentConfig):
+        """Store a config in the in-process cache."""
+        self._cache[agent_type] = (time.monotonic(), config)
+
+    async def _initialize_config_storage(self):
         """Initialize configuration storage in Redis."""
-        if not self.redis.exists("agent_configs"):
-            self.redis.hset(
+        if not await self.redis.exists("agent_configs"):
+            await self.redis.hset(
                 "agent_configs",
                 mapping={
-                    "created_at": datetime.utcnow().isoformat(),
-                    "last_updated": datetime.utcnow().isoformat(),
+                    "created_at": utc_now_iso(),
+                    "last_updated": utc_now_iso(),
                 },
             )
 
-    def load_config(self, agent_type: str) -> Optional[AgentConfig]:
+    async def load_config(self, agent_type: str) -> Optional[AgentConfig]:
         """
         Load configuration for an agent.
         Args:
@@ -64,49 +110,73 @@ class ConfigManager:
         Returns:
             Optional[AgentConfig]: Agent configuration if found
         """
+        cached = self._get_cached(agent_type)
+        if cached:
+            return cached
+
         # Try to load from Redis first
-        config_data = self.redis.hget(f"agent_config:{agent_type}", "config")
+        config_data = await self.redis.hget(f"agent_config:{agent_type}", "config")
         if config_data:
-            return AgentConfig.parse_raw(config_data)
+            config = AgentConfig.model_validate_json(config_data)
+            self._set_cached(agent_type, config)
+            return config
 
         # If not in Redis, try to load from file
-        config_file = self.config_dir / f"{agent_type.lower()}.yaml"
+        config_file = self.config_dir / f"{agent_type.lower()}.json"
         if config_file.exists():
-            with open(config_file) as f:
-                config_data = yaml.safe_load(f)
-                config = AgentConfig(**config_data)
-                self._save_config(agent_type, config)
-                return config
+            config = AgentConfig.model_validate_json(config_file.read_bytes())
+            await self._save_config(agent_type, config)
+            return config
+
+        legacy_file = self.config_dir / f"{agent_type.lower()}.yaml"
+        if legacy_file.exists():
+            # Saving rewrites the config as JSON, so YAML is only read once
+            config = AgentConfig(**self._load_legacy_yaml(legacy_file))
+            await self._save_config(agent_type, config)
+            return config
 
         # If no config found, create default
         default_config = AgentConfig(
-            agent_id=f"{agent_type.lower()}_{datetime.utcnow().timestamp()}",
+            agent_id=f"{agent_type.lower()}_{time.time_ns():x}",
             agent_type=agent_type,
         )
-        self._save_config(agent_type, default_config)
+        await self._save_config(agent_type, default_config)
         return default_config
 
-    @retry_operation
-    def _save_config(self, agent_type: str, config: AgentConfig):
+    @async_retry_operation
+    async def _save_config(self, agent_type: str, config: AgentConfig):
         """Save configuration to Redis and file."""
-        # Save to Redis
-        self.redis.hset(
-            f"agent_config:{agent_type}",
-            mapping={
-                "config": config.json(),
-                "updated_at": datetime.utcnow().isoformat(),
-            },
-        )
+        config_json = config.model_dump_json()
+        now = utc_now_iso()
+
+        # Save to Redis, along with the index and last_updated timestamp
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(
+                f"agent_config:{agent_type}",
+                mapping={"config": config_json, "updated_at": now},
+            )
+            pipe.hset(CONFIG_INDEX_KEY, agent_type, config_json)
+            pipe.hset("agent_configs", "last_updated", now)
+            await pipe.execute()
+        self._set_cached(agent_type, config)
 
         # Save to file
-        config_file = self.config_dir / f"{agent_type.lower()}.yaml"
-        with open(config_file, "w") as f:
-            yaml.dump(config.dict(), f)
+        config_file = self.config_dir / f"{agent_type.lower()}.json"
+        config_file.write_text(config.model_dump_json(indent=2))
+
+    @staticmethod
+    def _load_legacy_yaml(path: Path) -> Dict[str, Any]:
+        """Read a config file saved in the old YAML format."""
+        # PyYAML is slow to import and only needed for files not yet migrated
+        import yaml
 
-        # Update last_updated timestamp
-        self.redis.hset("agent_configs", "last_updated", datetime.utcnow().isoformat())
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        with open(path) as f:
+            return yaml.load(f, Loader=loader)
 
-    def update_config(self, agent_type: str, updates: Dict[str, Any]) -> AgentConfig:
+    async def update_config(
+        self, agent_type: str, updates: Dict[str, Any]
+    ) -> AgentConfig:
         """
         Update configuration for an agent.
         Args:
@@ -115,43 +185,67 @@ class ConfigManager:
         Returns:
             AgentConfig: Updated configuration
         """
-        current_config = self.load_config(agent_type)
+        current_config = await self.load_config(agent_type)
         if not current_config:
             raise ValueError(f"No configuration found for agent type: {agent_type}")
 
-        # Update configuration
-        updated_config = current_config.copy(update=updates)
-        updated_config.updated_at = datetime.utcnow()
+        # Update configuration, validating the merged result
+        updated_config = AgentConfig.model_validate(
+            {**current_config.model_dump(), **updates, "updated_at": datetime.utcnow()}
+        )
 
         # Save updated configuration
-        self._save_config(agent_type, updated_config)
+        await self._save_config(agent_type, updated_config)
 
         # Notify agents of configuration change
-        self._notify_config_change(agent_type, updated_config)
+        await self._notify_config_change(agent_type, updated_config)
 
         return updated_config
 
-    def _notify_config_change(self, agent_type: str, config: AgentConfig):
+    async def _notify_config_change(self, agent_type: str, config: AgentConfig):
         """Notify agents of configuration changes."""
-        self.redis.publish(
+        await self.redis.publish(
             f"config_change:{agent_type}",
-            json.dumps(
+            json_dumps(
                 {
                     "agent_type": agent_type,
-                    "config": config.json(),
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "config": config.model_dump_json(),
+                    "timestamp": utc_now_iso(),
                 }
             ),
         )
 
-    def get_all_configs(self) -> Dict[str, AgentConfig]:
+    async def get_all_configs(self) -> Dict[str, AgentConfig]:
         """Get all agent configurations."""
         configs = {}
-        for key in self.redis.keys("agent_config:*"):
-            agent_type = key.split(":")[1]
-            configs[agent_type] = self.load_config(agent_type)
+        index = await self.redis.hgetall(CONFIG_INDEX_KEY)
+        if not index:
+            index = await self._rebuild_config_index()
+
+        for agent_type, config_data in index.items():
+            configs[agent_type] = AgentConfig.model_validate_json(config_data)
+            self._set_cached(agent_type, configs[agent_type])
         return configs
 
+    async def _rebuild_config_index(self) -> Dict[str, str]:
+        """Index configs saved before the index existed, from per-agent keys."""
+        # SCAN does not block the server the way KEYS does
+        keys = [
+            key async for key in self.redis.scan_iter(match="agent_config:*", count=500)
+        ]
+        if not keys:
+            return {}
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hget(key, "config")
+            raws = await pipe.execute()
+
+        index = {key.split(":", 1)[1]: raw for key, raw in zip(keys, raws) if raw}
+        if index:
+            await self.redis.hset(CONFIG_INDEX_KEY, mapping=index)
+        return index
+
     def validate_config(self, config: AgentConfig) -> bool:
         """
         Validate agent configuration.
@@ -161,29 +255,9 @@ class ConfigManager:
             bool: True if configuration is valid
         """
         try:
-            # Validate required fields
-            if not config.agent_id or not config.agent_type:
-                return False
-
-            # Validate numeric fields
-            if config.max_retries < 1 or config.max_retries > 10:
-                return False
-            if config.retry_delay < 1 or config.retry_delay > 60:
-                return False
-            if config.timeout < 60 or config.timeout > 7200:
-                return False
-
-            # Validate log level
-            if config.log_level not in [
-                "DEBUG",
-                "INFO",
-                "WARNING",
-                "ERROR",
-                "CRITICAL",
-            ]:
-                return False
-
+            # Re-run the model's field constraints on the current values
+            AgentConfig.model_validate(config.model_dump())
             return True
-        except Exception as e:
+        except ValidationError as e:
             self.logger.error(f"Configuration validation error: {str(e)}")
             return False
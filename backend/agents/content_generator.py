@@ -1,11 +1,20 @@
-import json
+import asyncio
+import copy
+import hashlib
 import logging
+import os
 import re
-from collections import defaultdict
+import textwrap
+from collections import OrderedDict, defaultdict
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from string import Template
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from uuid import UUID
 
+import redis
+
+from ..core.json_utils import canonical_json, json_dumps, json_loads
 from ..schemas.content_schemas import (ContentFormat, ContentGenerationRequest,
                                        ContentGenerationResult, ContentStyle,
                                        ContentType, ContentValidationResult,
@@ -16,13 +25,168 @@ from ..schemas.message_schemas import AgentResponse, AgentTask
 from ..schemas.module_schemas import Module, ModuleContent, ModuleType
 from .base_agent import BaseAgent
 
+# Rendered content is shared between requests with the same type, topic,
+# difficulty, style and format
+CONTENT_CACHE_SIZE = int(os.getenv("CONTENT_CACHE_SIZE", 4096))
+CONTENT_CACHE_TTL = int(os.getenv("CONTENT_CACHE_TTL", 3600))  # seconds
+
+# Fields identifying a single piece of content, regenerated on every request
+INSTANCE_FIELDS = {"content_id", "created_at", "updated_at"}
+
+# Templates are parsed once per process and shared by every agent
+CONTENT_TEMPLATES = {
+    "example": Template(
+        textwrap.dedent(
+            """
+            Concept: $concept
+            Explanation: $explanation
+
+            Steps:
+            $steps
+
+            Tips:
+            $tips
+
+            Common Mistakes to Avoid:
+            $common_mistakes
+            """
+        )
+    ),
+    "exercise": Template(
+        textwrap.dedent(
+            """
+            Question: $question
+
+            Options:
+            $options
+
+            Correct Answer: $correct_answer
+            Explanation: $explanation
+
+            Difficulty Level: $difficulty_level
+
+            Hints:
+            $hints
+            """
+        )
+    ),
+    "visual": Template(
+        textwrap.dedent(
+            """
+            Title: $title
+            Description: $description
+
+            Type: $type
+            Data: $data
+
+            Style: $style
+            """
+        )
+    ),
+}
+
+# Topic keywords mapped to the visual and interactive component they suggest;
+# one case-insensitive scan finds the first keyword in the topic
+VISUAL_TYPE_RE = re.compile(
+    r"(?P<flowchart>process|flow)|(?P<comparison>compare|versus)"
+    r"|(?P<hierarchy>structure|hierarchy)",
+    re.IGNORECASE,
+)
+INTERACTIVE_TYPE_RE = re.compile(
+    r"(?P<quiz>quiz)|(?P<simulation>simulation)|(?P<practice>practice)",
+    re.IGNORECASE,
+)
+
+# Casual words that formal content must avoid and casual content should use
+INFORMAL_WORDS_RE = re.compile(r"\b(?:hey|cool|awesome)\b", re.IGNORECASE)
+
+# Topics whose helper lists are kept, per helper
+TOPIC_CACHE_SIZE = 2048
+
+CONTENT_MODELS = {
+    ContentType.EXAMPLE: ExampleContent,
+    ContentType.EXERCISE: ExerciseContent,
+    ContentType.VISUAL: VisualContent,
+    ContentType.INTERACTIVE: InteractiveContent,
+}
+
+
+@lru_cache(maxsize=TOPIC_CACHE_SIZE)
+def _steps_for(concept: str) -> Tuple[str, ...]:
+    """Build the steps for understanding a concept."""
+    return (
+        f"First, understand the basic definition of {concept}",
+        f"Next, identify the key components of {concept}",
+        f"Then, explore how {concept} is applied in practice",
+        f"Finally, analyze real-world examples of {concept}",
+    )
+
+
+@lru_cache(maxsize=TOPIC_CACHE_SIZE)
+def _tips_for(concept: str) -> Tuple[str, ...]:
+    """Build the tips for understanding a concept."""
+    return (
+        f"Break down {concept} into smaller parts",
+        f"Create visual representations of {concept}",
+        f"Practice applying {concept} in different contexts",
+        f"Review examples of {concept} regularly",
+    )
+
+
+@lru_cache(maxsize=TOPIC_CACHE_SIZE)
+def _mistakes_for(concept: str) -> Tuple[str, ...]:
+    """Build the common mistakes related to a concept."""
+    return (
+        f"Confusing {concept} with similar concepts",
+        f"Overcomplicating the understanding of {concept}",
+        f"Not practicing enough with {concept}",
+        f"Missing key aspects of {concept}",
+    )
+
 
 class ContentGeneratorAgent(BaseAgent):
     """Agent responsible for generating learning content."""
 
+    DEFAULT_OPTIONS: Tuple[str, ...] = (
+        "Option A: First possible answer",
+        "Option B: Second possible answer",
+        "Option C: Third possible answer",
+        "Option D: Fourth possible answer",
+    )
+
+    DEFAULT_HINTS: Tuple[str, ...] = (
+        "Consider the key concepts involved",
+        "Think about real-world applications",
+        "Review related examples",
+        "Break down the question into parts",
+    )
+
+    INTERACTIVE_DEPENDENCIES: Tuple[str, ...] = (
+        "jquery",
+        "bootstrap",
+        "interactive-js",
+    )
+
+    INTERACTIVE_EVENTS: Tuple[str, ...] = (
+        "onStart",
+        "onProgress",
+        "onComplete",
+        "onError",
+    )
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.content_templates = self._load_content_templates()
+        self._rendered_content: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._renderers: Dict[
+            ContentType,
+            Callable[[ContentGenerationRequest], Awaitable[GeneratedContent]],
+        ] = {
+            ContentType.EXAMPLE: self._generate_example,
+            ContentType.EXERCISE: self._generate_exercise,
+            ContentType.VISUAL: self._generate_visual,
+            ContentType.INTERACTIVE: self._generate_interactive,
+        }
 
     async def process_task(self, task: AgentTask) -> AgentResponse:
         """
@@ -53,74 +217,127 @@ class ContentGeneratorAgent(BaseAgent):
             )
 
             return AgentResponse(
-                task_id=task.message_id, result=result.dict(), error=None
+                task_id=task.message_id,
+                result=result.model_dump(mode="json"),
+                error=None,
             )
 
         except Exception as e:
             self.logger.error(f"Content generation failed: {str(e)}")
             return AgentResponse(task_id=task.message_id, result=None, error=str(e))
 
-    def _load_content_templates(self) -> Dict[str, str]:
-        """Load content generation templates."""
-        return {
-            "example": """
-                Concept: {concept}
-                Explanation: {explanation}
-
-                Steps:
-                {steps}
-
-                Tips:
-                {tips}
-
-                Common Mistakes to Avoid:
-                {common_mistakes}
-            """,
-            "exercise": """
-                Question: {question}
-
-                Options:
-                {options}
-
-                Correct Answer: {correct_answer}
-                Explanation: {explanation}
-
-                Difficulty Level: {difficulty_level}
-
-                Hints:
-                {hints}
-            """,
-            "visual": """
-                Title: {title}
-                Description: {description}
+    async def process_batch(self, tasks: List[AgentTask]) -> List[AgentResponse]:
+        """
+        Process several content generation tasks concurrently.
+        Requests for the same content are rendered once and shared through the
+        content cache; each task still gets its own content instance.
+        Args:
+            tasks: Tasks containing content generation requests
+        Returns:
+            List[AgentResponse]: One response per task, in task order
+        """
+        unique: Dict[str, ContentGenerationRequest] = {}
+        for task in tasks:
+            request = task.task_data.get("request")
+            if not request:
+                continue
+            try:
+                key = self._content_cache_key(request)
+            except (AttributeError, TypeError):
+                # Malformed requests are left for process_task to report
+                continue
+            unique.setdefault(key, request)
+        # Warm the cache once per distinct request; failures are reported
+        # per task below
+        await asyncio.gather(
+            *(self._generate_content(request) for request in unique.values()),
+            return_exceptions=True,
+        )
+        return await asyncio.gather(*(self.process_task(task) for task in tasks))
 
-                Type: {type}
-                Data: {data}
+    def _load_content_templates(self) -> Dict[str, Template]:
+        """Load content generation templates."""
+        return CONTENT_TEMPLATES
 
-                Style: {style}
-            """,
-        }
+    @staticmethod
+    def _bullets(items: List[str]) -> str:
+        """Format items as a markdown bullet list."""
+        return "- " + "\n- ".join(items) if items else ""
 
     async def _generate_content(
         self, request: ContentGenerationRequest
     ) -> GeneratedContent:
         """
-        Generate content based on request.
+        Generate content based on request, reusing earlier renders.
         Args:
             request: Content generation request
         Returns:
             GeneratedContent: Generated content
         """
-        if request.content_type == ContentType.EXAMPLE:
-            return await self._generate_example(request)
-        elif request.content_type == ContentType.EXERCISE:
-            return await self._generate_exercise(request)
-        elif request.content_type == ContentType.VISUAL:
-            return await self._generate_visual(request)
-        elif request.content_type == ContentType.INTERACTIVE:
-            return await self._generate_interactive(request)
+        key = self._content_cache_key(request)
+        rendered = self._rendered_content.get(key)
+        if rendered is not None:
+            self._rendered_content.move_to_end(key)
         else:
-            return await self._generate_text(request)
+            rendered = await self._get_shared_content(key)
+            if rendered is None:
+                content = await self._render_content(request)
+                rendered = content.model_dump(mode="json", exclude=INSTANCE_FIELDS)
+                await self._set_shared_content(key, rendered)
+            self._rendered_content[key] = rendered
+            if len(self._rendered_content) > CONTENT_CACHE_SIZE:
+                self._rendered_content.popitem(last=False)
+
+        # Renderers build their models unvalidated from trusted values, so
+        # validation happens once here, where cached data also comes in.
+        # Validation keeps nested values by reference, so hand it a copy
+        # that callers can change without touching the cache
+        model = CONTENT_MODELS.get(request.content_type, GeneratedContent)
+        return model.model_validate(copy.deepcopy(rendered))
+
+    def _content_cache_key(self, request: ContentGenerationRequest) -> str:
+        """Hash the request fields the rendered content depends on."""
+        fields = (
+            request.content_type.value,
+            request.topic,
+            request.difficulty_level,
+            request.style.value,
+            request.format.value,
+        )
+        # JSON keeps free-text fields apart: ("a|b", "c") and ("a", "b|c")
+        # would join to the same string
+        return hashlib.sha256(canonical_json(fields)).hexdigest()
+
+    async def _get_shared_content(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get content rendered by any agent process from Redis."""
+        try:
+            cached = await self.redis.get(f"content:{key}")
+        except redis.RedisError as e:
+            self.logger.warning(f"Content cache read failed: {str(e)}")
+            return None
+        return json_loads(cached) if cached is not None else None
+
+    async def _set_shared_content(self, key: str, rendered: Dict[str, Any]):
+        """Share rendered content with other agent processes via Redis."""
+        try:
+            await self.redis.set(
+                f"content:{key}", json_dumps(rendered), ex=CONTENT_CACHE_TTL
+            )
+        except redis.RedisError as e:
+            self.logger.warning(f"Content cache write failed: {str(e)}")
+
+    async def _render_content(
+        self, request: ContentGenerationRequest
+    ) -> GeneratedContent:
+        """
+        Render content for a request.
+        Args:
+            request: Content generation request
+        Returns:
+            GeneratedContent: Generated content
+        """
+        render = self._renderers.get(request.content_type, self._generate_text)
+        return await render(request)
 
     async def _generate_example(
         self, request: ContentGenerationRequest
@@ -133,18 +350,16 @@ class ContentGeneratorAgent(BaseAgent):
         tips = self._generate_tips(concept)
         common_mistakes = self._generate_common_mistakes(concept)
 
-        return ExampleContent(
+        return ExampleContent.model_construct(
             type=ContentType.EXAMPLE,
             format=request.format,
             style=request.style,
-            content=self.content_templates["example"].format(
+            content=self.content_templates["example"].substitute(
                 concept=concept,
                 explanation=explanation,
-                steps="\n".join(f"- {step}" for step in steps),
-                tips="\n".join(f"- {tip}" for tip in tips),
-                common_mistakes="\n".join(
-                    f"- {mistake}" for mistake in common_mistakes
-                ),
+                steps=self._bullets(steps),
+                tips=self._bullets(tips),
+                common_mistakes=self._bullets(common_mistakes),
             ),
             concept=concept,
             explanation=explanation,
@@ -166,17 +381,17 @@ class ContentGeneratorAgent(BaseAgent):
         )
         hints = self._generate_hints(question, correct_answer)
 
-        return ExerciseContent(
+        return ExerciseContent.model_construct(
             type=ContentType.EXERCISE,
             format=request.format,
             style=request.style,
-            content=self.content_templates["exercise"].format(
+            content=self.content_templates["exercise"].substitute(
                 question=question,
-                options="\n".join(f"- {option}" for option in options),
+                options=self._bullets(options),
                 correct_answer=correct_answer,
                 explanation=explanation,
                 difficulty_level=request.difficulty_level,
-                hints="\n".join(f"- {hint}" for hint in hints),
+                hints=self._bullets(hints),
             ),
             question=question,
             options=options,
@@ -191,26 +406,28 @@ class ContentGeneratorAgent(BaseAgent):
     ) -> VisualContent:
         """Generate visual content."""
         # Determine appropriate visual type and data
-        visual_type = self._determine_visual_type(request.topic)
-        data = self._generate_visual_data(request.topic, visual_type)
+        topic = request.topic
+        visual_type = self._determine_visual_type(topic)
+        data = self._generate_visual_data(topic, visual_type)
         style = self._generate_visual_style(request.style)
+        description = self._generate_visual_description(topic)
 
-        return VisualContent(
+        return VisualContent.model_construct(
             type=ContentType.VISUAL,
             format=request.format,
             style=request.style,
-            content=self.content_templates["visual"].format(
-                title=request.topic,
-                description=self._generate_visual_description(request.topic),
+            content=self.content_templates["visual"].substitute(
+                title=topic,
+                description=description,
                 type=visual_type,
-                data=json.dumps(data),
-                style=json.dumps(style),
+                data=json_dumps(data).decode(),
+                style=json_dumps(style).decode(),
             ),
-            title=request.topic,
-            description=self._generate_visual_description(request.topic),
-            type=visual_type,
+            title=topic,
+            description=description,
+            visual_type=visual_type,
             data=data,
-            style=style,
+            visual_style=style,
         )
 
     async def _generate_interactive(
@@ -223,18 +440,18 @@ class ContentGeneratorAgent(BaseAgent):
         dependencies = self._determine_dependencies(component_type)
         events = self._generate_events(component_type)
 
-        return InteractiveContent(
+        return InteractiveContent.model_construct(
             type=ContentType.INTERACTIVE,
             format=request.format,
             style=request.style,
-            content=json.dumps(
+            content=json_dumps(
                 {
                     "component_type": component_type,
                     "configuration": configuration,
                     "dependencies": dependencies,
                     "events": events,
                 }
-            ),
+            ).decode(),
             component_type=component_type,
             configuration=configuration,
             dependencies=dependencies,
@@ -249,7 +466,7 @@ class ContentGeneratorAgent(BaseAgent):
             request.topic, request.difficulty_level, request.style
         )
 
-        return GeneratedContent(
+        return GeneratedContent.model_construct(
             type=ContentType.TEXT,
             format=request.format,
             style=request.style,
@@ -268,30 +485,15 @@ class ContentGeneratorAgent(BaseAgent):
 
     def _generate_steps(self, concept: str) -> List[str]:
         """Generate steps for understanding a concept."""
-        return [
-            f"First, understand the basic definition of {concept}",
-            f"Next, identify the key components of {concept}",
-            f"Then, explore how {concept} is applied in practice",
-            f"Finally, analyze real-world examples of {concept}",
-        ]
+        return list(_steps_for(concept))
 
     def _generate_tips(self, concept: str) -> List[str]:
         """Generate tips for understanding a concept."""
-        return [
-            f"Break down {concept} into smaller parts",
-            f"Create visual representations of {concept}",
-            f"Practice applying {concept} in different contexts",
-            f"Review examples of {concept} regularly",
-        ]
+        return list(_tips_for(concept))
 
     def _generate_common_mistakes(self, concept: str) -> List[str]:
         """Generate common mistakes related to a concept."""
-        return [
-            f"Confusing {concept} with similar concepts",
-            f"Overcomplicating the understanding of {concept}",
-            f"Not practicing enough with {concept}",
-            f"Missing key aspects of {concept}",
-        ]
+        return list(_mistakes_for(concept))
 
     def _generate_question(self, topic: str, difficulty_level: str) -> str:
         """Generate a question about a topic."""
@@ -307,12 +509,7 @@ class ContentGeneratorAgent(BaseAgent):
     def _generate_options(self, question: str) -> List[str]:
         """Generate answer options for a question."""
         # Simple option generation
-        return [
-            "Option A: First possible answer",
-            "Option B: Second possible answer",
-            "Option C: Third possible answer",
-            "Option D: Fourth possible answer",
-        ]
+        return list(self.DEFAULT_OPTIONS)
 
     def _determine_correct_answer(self, question: str, options: List[str]) -> str:
         """Determine the correct answer from options."""
@@ -321,23 +518,12 @@ class ContentGeneratorAgent(BaseAgent):
 
     def _generate_hints(self, question: str, correct_answer: str) -> List[str]:
         """Generate hints for answering a question."""
-        return [
-            "Consider the key concepts involved",
-            "Think about real-world applications",
-            "Review related examples",
-            "Break down the question into parts",
-        ]
+        return list(self.DEFAULT_HINTS)
 
     def _determine_visual_type(self, topic: str) -> str:
         """Determine appropriate visual type for a topic."""
-        if "process" in topic.lower() or "flow" in topic.lower():
-            return "flowchart"
-        elif "compare" in topic.lower() or "versus" in topic.lower():
-            return "comparison"
-        elif "structure" in topic.lower() or "hierarchy" in topic.lower():
-            return "hierarchy"
-        else:
-            return "concept_map"
+        match = VISUAL_TYPE_RE.search(topic)
+        return match.lastgroup if match else "concept_map"
 
     def _generate_visual_data(self, topic: str, visual_type: str) -> Dict[str, Any]:
         """Generate data for visual content."""
@@ -365,14 +551,8 @@ class ContentGeneratorAgent(BaseAgent):
 
     def _determine_interactive_type(self, topic: str) -> str:
         """Determine appropriate interactive component type."""
-        if "quiz" in topic.lower():
-            return "quiz"
-        elif "simulation" in topic.lower():
-            return "simulation"
-        elif "practice" in topic.lower():
-            return "practice"
-        else:
-            return "exploration"
+        match = INTERACTIVE_TYPE_RE.search(topic)
+        return match.lastgroup if match else "exploration"
 
     def _generate_interactive_config(
         self, topic: str, component_type: str
@@ -386,11 +566,11 @@ class ContentGeneratorAgent(BaseAgent):
 
     def _determine_dependencies(self, component_type: str) -> List[str]:
         """Determine dependencies for interactive component."""
-        return ["jquery", "bootstrap", "interactive-js"]
+        return list(self.INTERACTIVE_DEPENDENCIES)
 
     def _generate_events(self, component_type: str) -> List[str]:
         """Generate events for interactive component."""
-        return ["onStart", "onProgress", "onComplete", "onError"]
+        return list(self.INTERACTIVE_EVENTS)
 
     def _generate_text_content(
         self, topic: str, difficulty_level: str, style: ContentStyle
@@ -430,11 +610,12 @@ class ContentGeneratorAgent(BaseAgent):
         if not self._validate_style(content.content, content.style):
             issues.append("Style inconsistency")
 
-        # Generate readability score
-        readability_score = self._calculate_readability(content.content)
-
-        # Generate complexity score
-        complexity_score = self._calculate_complexity(content.content)
+        # Both scores come from one tokenization of the content
+        word_count, sentence_count, long_word_count = self._content_stats(
+            content.content
+        )
+        readability_score = self._calculate_readability(word_count, sentence_count)
+        complexity_score = self._calculate_complexity(word_count, long_word_count)
 
         return ContentValidationResult(
             content_id=content.content_id,
@@ -448,33 +629,43 @@ class ContentGeneratorAgent(BaseAgent):
     def _validate_markdown(self, content: str) -> bool:
         """Validate markdown content."""
         # Basic markdown validation
-        return bool(re.match(r"^#", content))  # Check for at least one heading
+        return content.startswith("#")  # Check for at least one heading
 
     def _validate_style(self, content: str, style: ContentStyle) -> bool:
         """Validate content style."""
         # Style-specific validation
         if style == ContentStyle.FORMAL:
-            return not any(
-                word in content.lower() for word in ["hey", "cool", "awesome"]
-            )
+            return INFORMAL_WORDS_RE.search(content) is None
         elif style == ContentStyle.CASUAL:
-            return any(word in content.lower() for word in ["hey", "cool", "awesome"])
+            return INFORMAL_WORDS_RE.search(content) is not None
         return True
 
-    def _calculate_readability(self, content: str) -> float:
+    def _content_stats(self, content: str) -> Tuple[int, int, int]:
+        """
+        Count the words, sentences and long words of content.
+        Args:
+            content: Content to measure
+        Returns:
+            Tuple[int, int, int]: Word, sentence and long-word counts
+        """
+        words = content.split()
+        long_word_count = sum(len(word) > 6 for word in words)
+        # Same count as len(content.split(".")) without building the pieces
+        sentence_count = content.count(".") + 1
+        return len(words), sentence_count, long_word_count
+
+    def _calculate_readability(self, word_count: int, sentence_count: int) -> float:
         """Calculate content readability score."""
         # Simple readability calculation
-        words = content.split()
-        sentences = content.split(".")
-        if not sentences:
+        if not sentence_count:
             return 0.0
 
-        avg_words_per_sentence = len(words) / len(sentences)
+        avg_words_per_sentence = word_count / sentence_count
         return max(0.0, min(1.0, 1.0 - (avg_words_per_sentence / 20)))
 
-    def _calculate_complexity(self, content: str) -> float:
+    def _calculate_complexity(self, word_count: int, long_word_count: int) -> float:
         """Calculate content complexity score."""
         # Simple complexity calculation
-        words = content.split()
-        long_words = sum(1 for word in words if len(word) > 6)
-        return min(1.0, long_words / len(words))
+        if not word_count:
+            return 0.0
+        return min(1.0, long_word_count / word_count)
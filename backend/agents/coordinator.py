@@ -1,12 +1,14 @@
-import json
+import asyncio
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional, Type
-from uuid import UUID
+import time
+from collections import defaultdict
+from typing import Awaitable, Dict, List, Optional, Set, Type
+from uuid import UUID, uuid4
 
-from ..database.redis_config import get_redis_connection, retry_operation
+from ..core.clock import utc_now_iso
+from ..database.redis_config import async_retry_operation, get_async_redis_connection
 from ..queue.queue_manager import QueueManager
-from ..schemas.message_schemas import AgentResponse, AgentTask
+from ..schemas.message_schemas import AgentResponse, AgentTask, DeadLetterMessage
 from .base_agent import AgentError, BaseAgent
 
 
@@ -14,41 +16,57 @@ class AgentCoordinator:
     """Coordinates communication and task routing between agents."""
 
     def __init__(self):
-        self.redis = get_redis_connection()
+        self.redis = get_async_redis_connection()
         self.queue_manager = QueueManager()
         self.agents: Dict[str, BaseAgent] = {}
+        # Registered agents grouped by class name, for constant-time routing
+        self.agents_by_type: Dict[str, List[BaseAgent]] = defaultdict(list)
         self.logger = logging.getLogger("agent.coordinator")
 
-        # Set up dead letter queue
-        self.dead_letter_queue = self.queue_manager.get_queue("dead_letter")
+        self.trace_key = "message_trace"
 
-        # Initialize message tracing
-        self._initialize_tracing()
+        # Trace updates still in flight after route_task has returned
+        self._trace_updates: Set[asyncio.Task] = set()
 
-    def _initialize_tracing(self):
+    @classmethod
+    async def create(cls) -> "AgentCoordinator":
+        """
+        Create a coordinator and initialize message tracing in Redis.
+        Returns:
+            AgentCoordinator: The initialized coordinator
+        """
+        coordinator = cls()
+        await coordinator._initialize_tracing()
+        return coordinator
+
+    async def _initialize_tracing(self):
         """Initialize message tracing system."""
-        self.trace_key = "message_trace"
-        if not self.redis.exists(self.trace_key):
-            self.redis.hset(
-                self.trace_key,
-                mapping={
-                    "created_at": datetime.utcnow().isoformat(),
-                    "total_messages": 0,
-                    "failed_messages": 0,
-                },
-            )
+        # HSETNX only fills missing fields, so concurrent coordinators starting
+        # up never reset each other's counters
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hsetnx(self.trace_key, "created_at", utc_now_iso())
+            pipe.hsetnx(self.trace_key, "total_messages", 0)
+            pipe.hsetnx(self.trace_key, "failed_messages", 0)
+            await pipe.execute()
 
     def register_agent(self, agent: BaseAgent):
         """Register a new agent with the coordinator."""
+        if agent.agent_id in self.agents:
+            self.unregister_agent(agent.agent_id)
         self.agents[agent.agent_id] = agent
+        self.agents_by_type[agent.__class__.__name__].append(agent)
         self.logger.info(
             f"Registered agent {agent.agent_id} of type {agent.__class__.__name__}"
         )
 
     def unregister_agent(self, agent_id: str):
         """Unregister an agent from the coordinator."""
-        if agent_id in self.agents:
-            del self.agents[agent_id]
+        agent = self.agents.pop(agent_id, None)
+        if agent:
+            agent_type = agent.__class__.__name__
+            self.agents_by_type[agent_type].remove(agent)
+            if not self.agents_by_type[agent_type]:
+                del self.agents_by_type[agent_type]
             self.logger.info(f"Unregistered agent {agent_id}")
 
     async def route_task(self, task: AgentTask) -> UUID:
@@ -67,54 +85,85 @@ class AgentCoordinator:
             )
 
         # Create message trace
-        trace_id = self._create_message_trace(task)
+        trace_id = await self._create_message_trace(task)
 
         try:
-            # Route task to agent
-            message_id = await self.queue_manager.enqueue_message(
-                "agent_task", task, timeout=3600  # 1 hour timeout
+            # Route task to agent; the queue manager is synchronous, so keep
+            # its Redis round trips off the event loop
+            message_id = await asyncio.to_thread(
+                self.queue_manager.enqueue_message,
+                "agent_task",
+                task,
+                timeout=3600,  # 1 hour timeout
             )
 
-            # Update trace with routing info
-            self._update_message_trace(trace_id, "routed", message_id=message_id)
+            # Update trace with routing info without holding up the caller
+            self._track_trace_update(
+                self._update_message_trace(trace_id, "routed", message_id=message_id)
+            )
 
             return message_id
         except Exception as e:
-            # Update trace with error
-            self._update_message_trace(trace_id, "failed", error=str(e))
-            # Move to dead letter queue
-            await self._handle_failed_task(task, str(e))
+            # Record the failure and move the task to the dead letter queue;
+            # neither may mask or cancel the other, and the routing error is
+            # the one re-raised
+            trace_result, dead_letter_result = await asyncio.gather(
+                self._update_message_trace(trace_id, "failed", error=str(e)),
+                self._handle_failed_task(task, str(e)),
+                return_exceptions=True,
+            )
+            if isinstance(trace_result, Exception):
+                self.logger.error(f"Message trace update failed: {str(trace_result)}")
+            if isinstance(dead_letter_result, Exception):
+                self.logger.error(
+                    f"Failed to dead-letter task {task.message_id}: "
+                    f"{str(dead_letter_result)}"
+                )
             raise
 
+    def _track_trace_update(self, update: Awaitable[None]):
+        """Run a trace update in the background, logging it if it fails."""
+        update_task = asyncio.create_task(update)
+        self._trace_updates.add(update_task)
+        update_task.add_done_callback(self._trace_update_done)
+
+    def _trace_update_done(self, update_task: asyncio.Task):
+        """Forget a finished trace update and report its error, if any."""
+        self._trace_updates.discard(update_task)
+        if not update_task.cancelled() and update_task.exception():
+            self.logger.error(
+                f"Message trace update failed: {str(update_task.exception())}"
+            )
+
     def _find_suitable_agent(self, task: AgentTask) -> Optional[BaseAgent]:
         """Find an agent suitable for processing the task."""
-        for agent in self.agents.values():
-            if agent.__class__.__name__ == task.agent_type:
-                return agent
-        return None
+        agents = self.agents_by_type.get(task.agent_type)
+        return agents[0] if agents else None
 
-    @retry_operation
-    def _create_message_trace(self, task: AgentTask) -> str:
+    @async_retry_operation
+    async def _create_message_trace(self, task: AgentTask) -> str:
         """Create a new message trace entry."""
-        trace_id = str(UUID())
+        trace_id = uuid4().hex
         trace_data = {
             "trace_id": trace_id,
             "task_id": str(task.message_id),
             "agent_type": task.agent_type,
             "status": "created",
-            "created_at": datetime.utcnow().isoformat(),
+            # Nanosecond integers keep per-message timings precise and compact
+            "created_at_ns": time.time_ns(),
             "parent_request_id": str(task.parent_request_id),
         }
 
-        self.redis.hset(f"trace:{trace_id}", mapping=trace_data)
-
-        # Update trace statistics
-        self.redis.hincrby(self.trace_key, "total_messages", 1)
+        # Store the trace and update statistics in one round trip
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(f"trace:{trace_id}", mapping=trace_data)
+            pipe.hincrby(self.trace_key, "total_messages", 1)
+            await pipe.execute()
 
         return trace_id
 
-    @retry_operation
-    def _update_message_trace(
+    @async_retry_operation
+    async def _update_message_trace(
         self,
         trace_id: str,
         status: str,
@@ -122,40 +171,44 @@ class AgentCoordinator:
         error: Optional[str] = None,
     ):
         """Update a message trace entry."""
-        update_data = {"status": status, "updated_at": datetime.utcnow().isoformat()}
+        update_data = {"status": status, "updated_at_ns": time.time_ns()}
 
         if message_id:
             update_data["message_id"] = message_id
-        if error:
-            update_data["error"] = error
-            self.redis.hincrby(self.trace_key, "failed_messages", 1)
 
-        self.redis.hmset(f"trace:{trace_id}", update_data)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if error:
+                update_data["error"] = error
+                pipe.hincrby(self.trace_key, "failed_messages", 1)
+            pipe.hset(f"trace:{trace_id}", mapping=update_data)
+            await pipe.execute()
 
     async def _handle_failed_task(self, task: AgentTask, error: str):
         """Handle failed tasks by moving them to the dead letter queue."""
-        failed_task = {
-            "task": task.model_dump(),
-            "error": error,
-            "timestamp": datetime.utcnow().isoformat(),
-        }
+        failed_task = DeadLetterMessage(task=task, error=error, status="failed")
 
-        await self.queue_manager.enqueue_message(
-            "dead_letter", failed_task, timeout=3600
+        await asyncio.to_thread(
+            self.queue_manager.enqueue_message,
+            "dead_letter",
+            failed_task,
+            timeout=3600,
         )
 
-    def get_message_trace(self, trace_id: str) -> Optional[Dict]:
+    async def get_message_trace(self, trace_id: str) -> Optional[Dict]:
         """Get the trace information for a message."""
-        trace_data = self.redis.hgetall(f"trace:{trace_id}")
+        trace_data = await self.redis.hgetall(f"trace:{trace_id}")
         return trace_data if trace_data else None
 
-    def get_trace_statistics(self) -> Dict:
+    async def get_trace_statistics(self) -> Dict:
         """Get message tracing statistics."""
-        return self.redis.hgetall(self.trace_key)
+        return await self.redis.hgetall(self.trace_key)
 
     async def shutdown(self):
         """Shutdown the coordinator and all registered agents."""
+        if self._trace_updates:
+            await asyncio.gather(*self._trace_updates, return_exceptions=True)
         for agent in self.agents.values():
             await agent.shutdown()
         self.agents.clear()
+        self.agents_by_type.clear()
         self.logger.info("Agent coordinator shutdown complete")
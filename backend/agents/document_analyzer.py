@@ -1,13 +1,21 @@
+import asyncio
+import hashlib
 import json
 import logging
+import os
 import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-from uuid import UUID
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 
 import fitz  # PyMuPDF for PDF processing
 from docx import Document as DocxDocument
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
 
 from ..schemas.document_schemas import (ContentComplexity, DocumentAnalysis,
                                         DocumentProcessingResult,
@@ -16,6 +24,200 @@ from ..schemas.document_schemas import (ContentComplexity, DocumentAnalysis,
 from ..schemas.message_schemas import AgentResponse, AgentTask
 from .base_agent import BaseAgent
 
+# Words marking a sentence that states a prerequisite; matched as substrings
+# so that e.g. "prerequisites" and "assumed" also count
+PREREQUISITE_RE = re.compile(
+    r"prerequisite|required|before|assume|knowledge", re.IGNORECASE
+)
+SENTENCE_SPLIT_RE = re.compile(r"[.!?]+")
+
+# Each pair of adjacent words starting with a letter; the lookahead lets
+# pairs overlap, so "Deep Neural Network" yields both "Deep Neural" and
+# "Neural Network". Capitalization is checked with str.isupper, which
+# unlike [A-Z] also accepts e.g. "Élan Vital"
+LETTER_PAIR_RE = re.compile(r"(?<!\S)(?=([^\W\d_]\S*)\s+([^\W\d_]\S*))")
+
+# Text extraction flags for PDF pages, without embedded images
+PDF_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Smallest font size treated as a heading
+PDF_HEADING_SIZE = 14
+
+# PDFs with at least this many pages are extracted by several processes, and
+# documents with at least this many characters are analyzed by several
+PDF_PARALLEL_PAGES = int(os.getenv("PDF_PARALLEL_PAGES", 32))
+ANALYSIS_PARALLEL_CHARS = int(os.getenv("ANALYSIS_PARALLEL_CHARS", 1_000_000))
+PROCESS_WORKERS = min(8, os.cpu_count() or 1)
+_process_executor: Optional[ProcessPoolExecutor] = None
+
+# Analyses kept in memory, keyed by a hash of the uploaded file's bytes
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", 256))
+
+# Buffer size for reading uploaded files
+READ_CHUNK_SIZE = 1024 * 1024
+
+# WordprocessingML tags read directly from the DOCX body
+W_P = qn("w:p")
+W_STYLE_PATH = f"{qn('w:pPr')}/{qn('w:pStyle')}"
+W_VAL = qn("w:val")
+W_T = qn("w:t")
+W_TAB = qn("w:tab")
+W_BREAKS = (qn("w:br"), qn("w:cr"))
+
+# A whitespace-delimited word longer than six characters
+LONG_WORD_RE = re.compile(r"\S{7,}")
+
+
+def _extract_pdf_spans(
+    file_path: str, start: int, stop: int
+) -> List[Tuple[str, int]]:
+    """
+    Extract the non-empty text spans of a range of PDF pages.
+    Args:
+        file_path: Path to the PDF
+        start: First page index
+        stop: Page index to stop before
+    Returns:
+        List[Tuple[str, int]]: (text, heading level) of each span, in page
+            order; the level is 0 for body text
+    """
+    spans = []
+    with fitz.open(file_path) as doc:
+        for page_number in range(start, stop):
+            # Skip image blocks: their pixel data would be copied into the dict
+            page = doc[page_number]
+            blocks = page.get_text("dict", flags=PDF_TEXT_FLAGS)["blocks"]
+            for block in blocks:
+                for line in block.get("lines", ()):
+                    for span in line["spans"]:
+                        text = span["text"].strip()
+                        if not text:
+                            continue
+                        # Classify here so the workers do the thresholding
+                        size = span["size"]
+                        level = _heading_level(size) if size >= PDF_HEADING_SIZE else 0
+                        spans.append((text, level))
+    return spans
+
+
+def _get_process_executor() -> ProcessPoolExecutor:
+    """Get the process pool for CPU-bound document work, creating it on first use."""
+    global _process_executor
+    if _process_executor is None:
+        _process_executor = ProcessPoolExecutor(max_workers=PROCESS_WORKERS)
+    return _process_executor
+
+
+def _count_words(contents: List[str]) -> Tuple[int, int]:
+    """Count all words and long words across section contents."""
+    total_words = 0
+    long_words = 0
+    for content in contents:
+        # Both counts run in C; no Python loop over the words
+        total_words += len(content.split())
+        long_words += len(LONG_WORD_RE.findall(content))
+    return total_words, long_words
+
+
+def _find_key_concepts(contents: List[str]) -> List[str]:
+    """Find capitalized word pairs across section contents, deduped in order."""
+    # Dict keys dedupe like a set but keep first-seen order, so the same
+    # document always yields the same concept list
+    concepts: Dict[str, None] = {}
+    for content in contents:
+        # Look for capitalized phrases and technical terms
+        pairs = LETTER_PAIR_RE.findall(content)
+        concepts.update(
+            dict.fromkeys(
+                f"{first} {second}"
+                for first, second in pairs
+                if first[0].isupper() and second[0].isupper()
+            )
+        )
+    return list(concepts)
+
+
+def _find_prerequisites(contents: List[str]) -> List[str]:
+    """Find sentences mentioning prerequisites across section contents."""
+    prerequisites = []
+    for content in contents:
+        # Keep each sentence mentioning any keyword, once
+        for sentence in SENTENCE_SPLIT_RE.split(content):
+            if PREREQUISITE_RE.search(sentence):
+                prerequisites.append(sentence.strip())
+    return prerequisites
+
+
+def _file_digest(file_path: str) -> str:
+    """Hash a file's contents in fixed-size chunks."""
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _path_metadata(file_path: str, doc_type: DocumentType) -> Dict[str, Any]:
+    """Metadata derived from the file's path rather than its contents."""
+    # Plain text has no embedded title, so it is named after the file
+    if doc_type == DocumentType.TXT:
+        return {"title": Path(file_path).stem}
+    return {}
+
+
+def _renumber_sections(sections: List[DocumentSection]) -> None:
+    """Give sections fresh ids in place, keeping their links to each other."""
+    new_ids = {section.section_id: uuid4() for section in sections}
+    for section in sections:
+        section.section_id = new_ids[section.section_id]
+        if section.parent_section_id is not None:
+            section.parent_section_id = new_ids.get(
+                section.parent_section_id, section.parent_section_id
+            )
+        section.child_sections = [
+            new_ids.get(child, child) for child in section.child_sections
+        ]
+
+
+def _build_section(title: str, level: int, fragments: List[str]) -> DocumentSection:
+    """Build a finished document section from its heading and text fragments."""
+    return DocumentSection(
+        title=title,
+        content=" ".join(fragments),
+        level=level,
+        complexity=ContentComplexity.INTERMEDIATE,
+    )
+
+
+def _paragraph_text(paragraph) -> str:
+    """Get the text of a DOCX paragraph element, as python-docx renders it."""
+    parts = []
+    for element in paragraph.iter(W_T, W_TAB, *W_BREAKS):
+        if element.tag == W_T:
+            parts.append(element.text or "")
+        elif element.tag == W_TAB:
+            parts.append("\t")
+        else:
+            parts.append("\n")
+    return "".join(parts)
+
+
+@lru_cache(maxsize=64)
+def _heading_level(font_size: float) -> int:
+    """Map a font size to a heading level; PDFs use only a few distinct sizes."""
+    if font_size >= 24:
+        return 1
+    elif font_size >= 20:
+        return 2
+    elif font_size >= 16:
+        return 3
+    elif font_size >= 14:
+        return 4
+    elif font_size >= 12:
+        return 5
+    else:
+        return 6
+
 
 class DocumentAnalyzerAgent(BaseAgent):
     """Agent responsible for analyzing educational documents."""
@@ -27,6 +229,7 @@ class DocumentAnalyzerAgent(BaseAgent):
             DocumentType.DOCX: self._process_docx,
             DocumentType.TXT: self._process_txt,
         }
+        self._analysis_cache: OrderedDict[str, DocumentAnalysis] = OrderedDict()
 
     async def process_task(self, task: AgentTask) -> AgentResponse:
         """
@@ -57,7 +260,9 @@ class DocumentAnalyzerAgent(BaseAgent):
             )
 
             return AgentResponse(
-                task_id=task.message_id, result=result.dict(), error=None
+                task_id=task.message_id,
+                result=result.model_dump(mode="json"),
+                error=None,
             )
 
         except Exception as e:
@@ -79,15 +284,69 @@ class DocumentAnalyzerAgent(BaseAgent):
         if doc_type not in self.supported_types:
             raise ValueError(f"Unsupported document type: {doc_type}")
 
+        # Re-uploads of the same file reuse the earlier analysis; keyed on the
+        # enum value so "txt" and DocumentType.TXT share an entry
+        digest = await asyncio.to_thread(_file_digest, file_path)
+        key = f"{DocumentType(doc_type).value}:{digest}"
+        cached = self._analysis_cache.get(key)
+        if cached is not None:
+            self._analysis_cache.move_to_end(key)
+            # The bytes match, but this is a new analysis: its identity, its
+            # timestamp and metadata taken from the path follow this upload
+            # rather than the one that filled the cache
+            update: Dict[str, Any] = {
+                "document_id": document_id,
+                "analysis_timestamp": datetime.utcnow(),
+            }
+            path_metadata = _path_metadata(file_path, doc_type)
+            if path_metadata:
+                update["metadata"] = {**cached.metadata, **path_metadata}
+                if "title" in path_metadata:
+                    update["title"] = path_metadata["title"]
+            analysis = cached.model_copy(update=update, deep=True)
+            _renumber_sections(analysis.sections)
+            return analysis
+
+        analysis = await self._run_analysis(document_id, file_path, doc_type)
+        self._analysis_cache[key] = analysis
+        if len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+            self._analysis_cache.popitem(last=False)
+        return analysis.model_copy(deep=True)
+
+    async def _run_analysis(
+        self, document_id: UUID, file_path: str, doc_type: DocumentType
+    ) -> DocumentAnalysis:
+        """
+        Parse and analyze a document without consulting the analysis cache.
+        Args:
+            document_id: UUID of the document
+            file_path: Path to the document
+            doc_type: Type of document
+        Returns:
+            DocumentAnalysis: Analysis results
+        """
         # Process document using appropriate method
         sections, metadata = await self.supported_types[doc_type](file_path)
 
+        # The content scans are pure-Python CPU work; for large documents run
+        # them side by side in worker processes, sending only the text
+        contents = [section.content for section in sections]
+        scans = (_count_words, _find_key_concepts, _find_prerequisites)
+        if sum(map(len, contents)) < ANALYSIS_PARALLEL_CHARS:
+            results = [scan(contents) for scan in scans]
+        else:
+            loop = asyncio.get_running_loop()
+            executor = _get_process_executor()
+            results = await asyncio.gather(
+                *(loop.run_in_executor(executor, scan, contents) for scan in scans)
+            )
+        word_counts, key_concepts, prerequisites = results
+
         # Analyze content complexity
-        overall_complexity = self._analyze_complexity(sections)
+        overall_complexity = self._complexity_from_counts(*word_counts)
 
-        # Extract main topics and key concepts
+        # Extract main topics
         main_topics = self._extract_main_topics(sections)
-        key_concepts = self._extract_key_concepts(sections)
 
         # Create document analysis
         return DocumentAnalysis(
@@ -101,7 +360,7 @@ class DocumentAnalyzerAgent(BaseAgent):
             sections=sections,
             main_topics=main_topics,
             key_concepts=key_concepts,
-            prerequisites=self._identify_prerequisites(sections),
+            prerequisites=prerequisites,
             target_audience=self._determine_target_audience(
                 sections, overall_complexity
             ),
@@ -113,46 +372,57 @@ class DocumentAnalyzerAgent(BaseAgent):
         self, file_path: str
     ) -> tuple[List[DocumentSection], Dict[str, Any]]:
         """Process a PDF document."""
-        doc = fitz.open(file_path)
-        sections = []
-        current_section = None
-
-        for page in doc:
-            blocks = page.get_text("dict")["blocks"]
-            for block in blocks:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            text = span["text"].strip()
-                            if not text:
-                                continue
-
-                            # Check if this is a heading
-                            font_size = span["size"]
-                            if font_size >= 14:  # Assuming headings are larger
-                                if current_section:
-                                    sections.append(current_section)
-                                current_section = DocumentSection(
-                                    title=text,
-                                    content="",
-                                    level=self._determine_heading_level(font_size),
-                                    complexity=ContentComplexity.INTERMEDIATE,
-                                )
-                            elif current_section:
-                                current_section.content += text + " "
-
-        if current_section:
-            sections.append(current_section)
+        with fitz.open(file_path) as doc:
+            page_count = len(doc)
+            metadata = {
+                "title": doc.metadata.get("title", "Untitled"),
+                "author": doc.metadata.get("author"),
+                "creation_date": doc.metadata.get("creationDate"),
+                "last_modified": doc.metadata.get("modDate"),
+                "total_pages": page_count,
+            }
+
+        # Text extraction is CPU-bound and PyMuPDF documents cannot be shared
+        # between threads, so long PDFs are split into page ranges that worker
+        # processes open independently
+        if page_count < PDF_PARALLEL_PAGES:
+            page_spans = [
+                await asyncio.to_thread(_extract_pdf_spans, file_path, 0, page_count)
+            ]
+        else:
+            loop = asyncio.get_running_loop()
+            step = -(-page_count // PROCESS_WORKERS)
+            page_spans = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        _get_process_executor(),
+                        _extract_pdf_spans,
+                        file_path,
+                        start,
+                        min(start + step, page_count),
+                    )
+                    for start in range(0, page_count, step)
+                )
+            )
 
-        metadata = {
-            "title": doc.metadata.get("title", "Untitled"),
-            "author": doc.metadata.get("author"),
-            "creation_date": doc.metadata.get("creationDate"),
-            "last_modified": doc.metadata.get("modDate"),
-            "total_pages": len(doc),
-        }
+        # Group the spans into sections, in page order; only the heading's
+        # title and level are tracked until the section is complete
+        sections = []
+        heading: Optional[Tuple[str, int]] = None
+        fragments: List[str] = []
+        for spans in page_spans:
+            for text, level in spans:
+                if level:
+                    if heading:
+                        sections.append(_build_section(*heading, fragments))
+                        fragments = []
+                    heading = (text, level)
+                elif heading:
+                    fragments.append(text)
+
+        if heading:
+            sections.append(_build_section(*heading, fragments))
 
-        doc.close()
         return sections, metadata
 
     async def _process_docx(
@@ -161,24 +431,35 @@ class DocumentAnalyzerAgent(BaseAgent):
         """Process a DOCX document."""
         doc = DocxDocument(file_path)
         sections = []
-        current_section = None
-
-        for paragraph in doc.paragraphs:
-            if paragraph.style.name.startswith("Heading"):
-                if current_section:
-                    sections.append(current_section)
-                level = int(paragraph.style.name[-1])
-                current_section = DocumentSection(
-                    title=paragraph.text,
-                    content="",
-                    level=level,
-                    complexity=ContentComplexity.INTERMEDIATE,
-                )
-            elif current_section:
-                current_section.content += paragraph.text + " "
-
-        if current_section:
-            sections.append(current_section)
+        heading: Optional[Tuple[str, int]] = None
+        fragments: List[str] = []
+
+        # Resolve style ids once; Paragraph.style searches the styles part on
+        # every access
+        style_names = {style.style_id: style.name for style in doc.styles}
+        default_style = doc.styles.default(WD_STYLE_TYPE.PARAGRAPH)
+        default_name = default_style.name if default_style is not None else ""
+
+        # Walk the body's paragraph elements directly instead of wrapping each
+        # one in a python-docx Paragraph
+        for paragraph in doc.element.body.iterchildren(W_P):
+            style = paragraph.find(W_STYLE_PATH)
+            style_name = (
+                style_names.get(style.get(W_VAL), default_name)
+                if style is not None
+                else default_name
+            )
+            text = _paragraph_text(paragraph)
+            if style_name.startswith("Heading"):
+                if heading:
+                    sections.append(_build_section(*heading, fragments))
+                    fragments = []
+                heading = (text, int(style_name[-1]))
+            elif heading:
+                fragments.append(text)
+
+        if heading:
+            sections.append(_build_section(*heading, fragments))
 
         metadata = {
             "title": doc.core_properties.title or "Untitled",
@@ -194,8 +475,9 @@ class DocumentAnalyzerAgent(BaseAgent):
         self, file_path: str
     ) -> tuple[List[DocumentSection], Dict[str, Any]]:
         """Process a TXT document."""
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        # One large buffered read, decoded in a single pass
+        with open(file_path, "rb", buffering=READ_CHUNK_SIZE) as f:
+            content = f.read().decode("utf-8", errors="replace")
 
         # Simple section detection based on newlines and common heading patterns
         sections = []
@@ -207,36 +489,25 @@ class DocumentAnalyzerAgent(BaseAgent):
         )
         sections.append(current_section)
 
-        metadata = {"title": Path(file_path).stem, "total_pages": 1}
+        metadata = {**_path_metadata(file_path, DocumentType.TXT), "total_pages": 1}
 
         return sections, metadata
 
     def _determine_heading_level(self, font_size: float) -> int:
         """Determine heading level based on font size."""
-        if font_size >= 24:
-            return 1
-        elif font_size >= 20:
-            return 2
-        elif font_size >= 16:
-            return 3
-        elif font_size >= 14:
-            return 4
-        elif font_size >= 12:
-            return 5
-        else:
-            return 6
+        return _heading_level(font_size)
 
     def _analyze_complexity(self, sections: List[DocumentSection]) -> ContentComplexity:
         """Analyze content complexity based on various factors."""
-        # Simple complexity analysis based on word length and sentence structure
-        total_words = 0
-        long_words = 0
-
-        for section in sections:
-            words = section.content.split()
-            total_words += len(words)
-            long_words += sum(1 for word in words if len(word) > 6)
+        return self._complexity_from_counts(
+            *_count_words([section.content for section in sections])
+        )
 
+    def _complexity_from_counts(
+        self, total_words: int, long_words: int
+    ) -> ContentComplexity:
+        """Classify complexity by the share of long words."""
+        # Simple complexity analysis based on word length and sentence structure
         if total_words == 0:
             return ContentComplexity.BEGINNER
 
@@ -258,37 +529,11 @@ class DocumentAnalyzerAgent(BaseAgent):
 
     def _extract_key_concepts(self, sections: List[DocumentSection]) -> List[str]:
         """Extract key concepts from document content."""
-        concepts = set()
-        for section in sections:
-            # Look for capitalized phrases and technical terms
-            words = section.content.split()
-            for i in range(len(words) - 1):
-                if words[i][0].isupper() and words[i + 1][0].isupper():
-                    concepts.add(f"{words[i]} {words[i + 1]}")
-        return list(concepts)
+        return _find_key_concepts([section.content for section in sections])
 
     def _identify_prerequisites(self, sections: List[DocumentSection]) -> List[str]:
         """Identify prerequisites from document content."""
-        prerequisites = []
-        prerequisite_keywords = [
-            "prerequisite",
-            "required",
-            "before",
-            "assume",
-            "knowledge",
-        ]
-
-        for section in sections:
-            content_lower = section.content.lower()
-            for keyword in prerequisite_keywords:
-                if keyword in content_lower:
-                    # Extract the sentence containing the keyword
-                    sentences = re.split(r"[.!?]+", section.content)
-                    for sentence in sentences:
-                        if keyword in sentence.lower():
-                            prerequisites.append(sentence.strip())
-
-        return prerequisites
+        return _find_prerequisites([section.content for section in sections])
 
     def _determine_target_audience(
         self, sections: List[DocumentSection], complexity: ContentComplexity
@@ -1,31 +1,108 @@
 import json
 import logging
-from collections import defaultdict
+import re
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
-from ..schemas.document_schemas import ContentComplexity, DocumentAnalysis
+from ..schemas.document_schemas import (ContentComplexity, DocumentAnalysis,
+                                        DocumentSection)
 from ..schemas.message_schemas import AgentResponse, AgentTask
 from ..schemas.module_schemas import (LearningObjective, Module, ModuleContent,
                                       ModulePlan, ModulePlanningResult,
                                       ModulePlanningStatus, ModuleType)
 from .base_agent import BaseAgent
 
+BLOOM_LEVELS = [
+    "Remember",
+    "Understand",
+    "Apply",
+    "Analyze",
+    "Evaluate",
+    "Create",
+]
+
+# Bloom's taxonomy level targeted at each content complexity
+BLOOM_LEVEL_BY_COMPLEXITY = {
+    ContentComplexity.BEGINNER: BLOOM_LEVELS[0],  # Remember
+    ContentComplexity.INTERMEDIATE: BLOOM_LEVELS[2],  # Apply
+}
+
+# Interactive elements suggested for each content type
+INTERACTIVE_ELEMENTS = {
+    ModuleType.INTRODUCTION: ("Overview", "Key Points", "Navigation Guide"),
+    ModuleType.CONCEPT: (
+        "Concept Map",
+        "Interactive Diagram",
+        "Definition Cards",
+    ),
+    ModuleType.EXAMPLE: (
+        "Step-by-Step Guide",
+        "Interactive Example",
+        "Practice Problem",
+    ),
+    ModuleType.EXERCISE: (
+        "Interactive Quiz",
+        "Practice Exercise",
+        "Progress Tracker",
+    ),
+    ModuleType.QUIZ: ("Multiple Choice", "True/False", "Matching Exercise"),
+    ModuleType.SUMMARY: ("Key Takeaways", "Review Questions", "Next Steps"),
+}
+
+# Exercises generated for each key concept of a section
+EXERCISE_TEMPLATES = (
+    "Explain the concept of {keyword} in your own words",
+    "Provide a real-world example of {keyword}",
+    "Compare and contrast {keyword} with related concepts",
+    "Apply {keyword} to solve a practical problem",
+)
+
+DIGIT_RE = re.compile(r"\d")
+
+# Title keywords mapped to the content type they indicate, tried in priority
+# order; each group is named after its ModuleType value
+CONTENT_TYPE_RE = re.compile(
+    r"^(?:(?=.*?example)(?P<example>)"
+    r"|(?=.*?(?:exercise|practice))(?P<exercise>)"
+    r"|(?=.*?(?:quiz|test))(?P<quiz>))",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Phrases that introduce an example, matched anywhere in a sentence
+EXAMPLE_RE = re.compile(
+    r"example|for instance|such as|like|including", re.IGNORECASE
+)
+
+# Distinct keywords whose generated strings are kept; sections of a document
+# share keywords, so their modules reuse the same string objects
+KEYWORD_CACHE_SIZE = 2048
+
+
+@lru_cache(maxsize=KEYWORD_CACHE_SIZE)
+def _exercises_for(keyword: str) -> Tuple[str, ...]:
+    """Build the exercises for a key concept."""
+    return tuple(template.format(keyword=keyword) for template in EXERCISE_TEMPLATES)
+
+
+@lru_cache(maxsize=KEYWORD_CACHE_SIZE)
+def _visual_aids_for(keyword: str) -> Tuple[str, ...]:
+    """Build the visual aids suggested for a key concept."""
+    visual_aids = []
+    if len(keyword.split()) > 1:  # Multi-word concepts
+        visual_aids.append(f"Diagram for {keyword}")
+    if DIGIT_RE.search(keyword):  # Numerical concepts
+        visual_aids.append(f"Chart for {keyword}")
+    return tuple(visual_aids)
+
 
 class ModulePlannerAgent(BaseAgent):
     """Agent responsible for planning learning modules from document analysis."""
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.bloom_levels = [
-            "Remember",
-            "Understand",
-            "Apply",
-            "Analyze",
-            "Evaluate",
-            "Create",
-        ]
+        self.bloom_levels = list(BLOOM_LEVELS)
 
     async def process_task(self, task: AgentTask) -> AgentResponse:
         """
@@ -53,7 +130,9 @@ class ModulePlannerAgent(BaseAgent):
             )
 
             return AgentResponse(
-                task_id=task.message_id, result=result.dict(), error=None
+                task_id=task.message_id,
+                result=result.model_dump(mode="json"),
+                error=None,
             )
 
         except Exception as e:
@@ -104,34 +183,51 @@ class ModulePlannerAgent(BaseAgent):
             List[Module]: List of learning modules
         """
         modules = []
-        current_module = None
+        module_section = None
+        contents: List[ModuleContent] = []
 
+        # Each module is built once, with all of its contents, when the next
+        # top-level section starts
         for section in sections:
             # Create new module for top-level sections
             if section.level <= 2:
-                if current_module:
-                    modules.append(current_module)
-
-                current_module = Module(
-                    title=section.title,
-                    description=section.content[:200]
-                    + "...",  # First 200 chars as description
-                    level=section.level,
-                    difficulty_level=section.complexity.value,
-                    learning_objectives=self._create_learning_objectives(section),
-                )
+                if module_section:
+                    modules.append(self._build_module(module_section, contents))
+                module_section = section
+                contents = []
 
             # Add content to current module
-            if current_module:
-                content = self._create_module_content(section)
-                current_module.contents.append(content)
+            if module_section:
+                contents.append(self._create_module_content(section))
 
         # Add the last module
-        if current_module:
-            modules.append(current_module)
+        if module_section:
+            modules.append(self._build_module(module_section, contents))
 
         return modules
 
+    def _build_module(
+        self, section: DocumentSection, contents: List[ModuleContent]
+    ) -> Module:
+        """
+        Build a learning module from its top-level section and contents.
+        Args:
+            section: Section that starts the module
+            contents: Contents of the module's sections
+        Returns:
+            Module: The learning module
+        """
+        return Module(
+            title=section.title,
+            description=section.content[:200]
+            + "...",  # First 200 chars as description
+            level=section.level,
+            contents=contents,
+            total_duration=sum(content.estimated_duration for content in contents),
+            difficulty_level=section.complexity.value,
+            learning_objectives=self._create_learning_objectives(section),
+        )
+
     def _create_learning_objectives(
         self, section: DocumentSection
     ) -> List[LearningObjective]:
@@ -169,16 +265,17 @@ class ModulePlannerAgent(BaseAgent):
         """
         # Determine content type based on section level and content
         content_type = self._determine_content_type(section)
+        word_count, examples = self._scan_content(section)
 
         return ModuleContent(
             type=content_type,
             title=section.title,
             content=section.content,
-            estimated_duration=self._estimate_duration(section),
+            estimated_duration=self._estimate_duration(word_count),
             difficulty_level=section.complexity.value,
             interactive_elements=self._suggest_interactive_elements(content_type),
             visual_aids=self._suggest_visual_aids(section),
-            examples=self._extract_examples(section),
+            examples=examples,
             exercises=self._generate_exercises(section),
         )
 
@@ -186,97 +283,62 @@ class ModulePlannerAgent(BaseAgent):
         """Determine the type of content based on section characteristics."""
         if section.level == 1:
             return ModuleType.INTRODUCTION
-        elif "example" in section.title.lower():
-            return ModuleType.EXAMPLE
-        elif "exercise" in section.title.lower() or "practice" in section.title.lower():
-            return ModuleType.EXERCISE
-        elif "quiz" in section.title.lower() or "test" in section.title.lower():
-            return ModuleType.QUIZ
-        elif section.level == max(section.level, 6):  # Lowest level section
+        match = CONTENT_TYPE_RE.match(section.title)
+        if match:
+            return ModuleType(match.lastgroup)
+        elif section.level >= 6:  # Lowest level section
             return ModuleType.SUMMARY
         else:
             return ModuleType.CONCEPT
 
     def _determine_bloom_level(self, complexity: ContentComplexity) -> str:
         """Determine Bloom's taxonomy level based on content complexity."""
-        if complexity == ContentComplexity.BEGINNER:
-            return self.bloom_levels[0]  # Remember
-        elif complexity == ContentComplexity.INTERMEDIATE:
-            return self.bloom_levels[2]  # Apply
-        else:
-            return self.bloom_levels[4]  # Evaluate
+        # Anything beyond intermediate targets Evaluate
+        return BLOOM_LEVEL_BY_COMPLEXITY.get(complexity, BLOOM_LEVELS[4])
 
-    def _estimate_duration(self, section: DocumentSection) -> int:
+    def _estimate_duration(self, word_count: int) -> int:
         """Estimate duration for a section in minutes."""
         # Rough estimation based on word count
-        word_count = len(section.content.split())
         return max(5, min(60, word_count // 100))  # 5-60 minutes
 
     def _suggest_interactive_elements(self, content_type: ModuleType) -> List[str]:
         """Suggest interactive elements based on content type."""
-        suggestions = {
-            ModuleType.INTRODUCTION: ["Overview", "Key Points", "Navigation Guide"],
-            ModuleType.CONCEPT: [
-                "Concept Map",
-                "Interactive Diagram",
-                "Definition Cards",
-            ],
-            ModuleType.EXAMPLE: [
-                "Step-by-Step Guide",
-                "Interactive Example",
-                "Practice Problem",
-            ],
-            ModuleType.EXERCISE: [
-                "Interactive Quiz",
-                "Practice Exercise",
-                "Progress Tracker",
-            ],
-            ModuleType.QUIZ: ["Multiple Choice", "True/False", "Matching Exercise"],
-            ModuleType.SUMMARY: ["Key Takeaways", "Review Questions", "Next Steps"],
-        }
-        return suggestions.get(content_type, [])
+        return list(INTERACTIVE_ELEMENTS.get(content_type, ()))
 
     def _suggest_visual_aids(self, section: DocumentSection) -> List[str]:
         """Suggest visual aids based on section content."""
-        visual_aids = []
-
         # Look for concepts that might benefit from visual representation
-        for keyword in section.keywords:
-            if len(keyword.split()) > 1:  # Multi-word concepts
-                visual_aids.append(f"Diagram for {keyword}")
-            if any(char.isdigit() for char in keyword):  # Numerical concepts
-                visual_aids.append(f"Chart for {keyword}")
-
-        return visual_aids
+        return [
+            visual_aid
+            for keyword in section.keywords
+            for visual_aid in _visual_aids_for(keyword)
+        ]
 
-    def _extract_examples(self, section: DocumentSection) -> List[str]:
-        """Extract examples from section content."""
+    def _scan_content(self, section: DocumentSection) -> Tuple[int, List[str]]:
+        """
+        Count words and extract examples in a single pass over the sentences.
+        Args:
+            section: Document section
+        Returns:
+            Tuple[int, List[str]]: Word count and example sentences
+        """
+        has_example = EXAMPLE_RE.search
+        word_count = 0
         examples = []
-        example_keywords = ["example", "for instance", "such as", "like", "including"]
-
-        sentences = section.content.split(". ")
-        for sentence in sentences:
-            if any(keyword in sentence.lower() for keyword in example_keywords):
+        for sentence in section.content.split(". "):
+            word_count += len(sentence.split())
+            if has_example(sentence):
                 examples.append(sentence.strip())
-
-        return examples
+        return word_count, examples
 
     def _generate_exercises(self, section: DocumentSection) -> List[str]:
         """Generate exercises based on section content."""
-        exercises = []
-
         # Create exercises for each key concept
-        for keyword in section.keywords:
-            exercises.extend(
-                [
-                    f"Explain the concept of {keyword} in your own words",
-                    f"Provide a real-world example of {keyword}",
-                    f"Compare and contrast {keyword} with related concepts",
-                    f"Apply {keyword} to solve a practical problem",
-                ]
-            )
-
-        return exercises
+        return [
+            exercise
+            for keyword in section.keywords
+            for exercise in _exercises_for(keyword)
+        ]
 
     def _optimize_learning_path(self, modules: List[Module]) -> List[UUID]:
         """
@@ -286,32 +348,37 @@ class ModulePlannerAgent(BaseAgent):
         Returns:
             List[UUID]: Optimized sequence of module IDs
         """
-        # Create dependency graph
-        graph = defaultdict(list)
-        for module in modules:
+        # Index modules so the graph and visited set work on small integers
+        index = {module.module_id: i for i, module in enumerate(modules)}
+        dependents: List[List[int]] = [[] for _ in modules]
+        for i, module in enumerate(modules):
             for prereq_id in module.prerequisites:
-                graph[prereq_id].append(module.module_id)
+                if prereq_id in index:
+                    dependents[index[prereq_id]].append(i)
 
-        # Topological sort for prerequisite ordering
-        visited = set()
+        # Topological sort for prerequisite ordering, as an iterative
+        # post-order DFS so long prerequisite chains cannot hit the
+        # recursion limit
+        visited = bytearray(len(modules))
         path = []
 
-        def visit(module_id: UUID):
-            if module_id in visited:
-                return
-            visited.add(module_id)
-            for next_id in graph[module_id]:
-                visit(next_id)
-            path.append(module_id)
-
-        # Start with modules that have no prerequisites
-        for module in modules:
-            if not module.prerequisites:
-                visit(module.module_id)
-
-        # Add any remaining modules
-        for module in modules:
-            if module.module_id not in visited:
-                visit(module.module_id)
+        # Start with modules that have no prerequisites, then any remaining
+        starts = [i for i, module in enumerate(modules) if not module.prerequisites]
+        starts.extend(range(len(modules)))
+        for start in starts:
+            if visited[start]:
+                continue
+            visited[start] = 1
+            stack = [(start, iter(dependents[start]))]
+            while stack:
+                node, pending = stack[-1]
+                for next_node in pending:
+                    if not visited[next_node]:
+                        visited[next_node] = 1
+                        stack.append((next_node, iter(dependents[next_node])))
+                        break
+                else:
+                    stack.pop()
+                    path.append(modules[node].module_id)
 
         return path
@@ -1,10 +1,14 @@
+import hashlib
 import json
 import logging
+import os
 import re
-from collections import defaultdict
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
-from uuid import UUID
+from typing import Any, Dict, List, Optional, Pattern, Set, Tuple
+from uuid import UUID, uuid4
 
 from ..schemas.message_schemas import AgentResponse, AgentTask
 from ..schemas.quality_schemas import (AccessibilityCheck, AccuracyCheck,
@@ -15,6 +19,54 @@ from ..schemas.quality_schemas import (AccessibilityCheck, AccuracyCheck,
                                        QualityScore)
 from .base_agent import BaseAgent
 
+# Simple technical term detection: any of these substrings, in any case
+TECHNICAL_TERM_RE = re.compile(
+    r"[-_]|api|sdk|framework|algorithm|protocol", re.IGNORECASE
+)
+# Zero-width match at the start of each whitespace-delimited technical term
+TECHNICAL_WORD_RE = re.compile(
+    r"(?<!\S)(?=\S*?(?:[-_]|api|sdk|framework|algorithm|protocol))", re.IGNORECASE
+)
+
+# A whitespace-delimited word longer than six characters
+LONG_WORD_RE = re.compile(r"\S{7,}")
+
+# Assessments kept in memory, keyed by a hash of the content and its type
+ASSESSMENT_CACHE_SIZE = int(os.getenv("ASSESSMENT_CACHE_SIZE", 1024))
+
+# Quality levels from lowest to highest; each level above POOR has a threshold
+# named after its value
+QUALITY_LEVELS = (
+    QualityLevel.POOR,
+    QualityLevel.NEEDS_IMPROVEMENT,
+    QualityLevel.SATISFACTORY,
+    QualityLevel.GOOD,
+    QualityLevel.EXCELLENT,
+)
+
+# Levels at which a metric is reported as an issue and gets improvements
+NEEDS_WORK_LEVELS = frozenset({QualityLevel.NEEDS_IMPROVEMENT, QualityLevel.POOR})
+
+# Levels whose score already clears a metric's suggestion threshold, except
+# for metrics where a higher score is worse
+GOOD_LEVELS = frozenset({QualityLevel.GOOD, QualityLevel.EXCELLENT})
+LOWER_IS_BETTER = frozenset({QualityMetric.COMPLEXITY})
+
+# Placeholder scores for the checks that do not inspect the content yet
+ACCURACY_CHECK_SCORE = 0.8
+ENGAGEMENT_CHECK_SCORE = 0.7
+ACCESSIBILITY_CHECK_SCORE = 0.8
+
+
+@dataclass(frozen=True)
+class ContentStats:
+    """Word-level counts of content, shared by the text-based metrics."""
+
+    word_count: int
+    sentence_count: int
+    long_word_count: int
+    technical_term_count: int
+
 
 class QualityAssuranceAgent(BaseAgent):
     """Agent responsible for quality assurance of generated content."""
@@ -22,7 +74,23 @@ class QualityAssuranceAgent(BaseAgent):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.quality_thresholds = self._load_quality_thresholds()
+        self.level_cutoffs = self._build_level_cutoffs()
+        # Score each metric is improved towards, keyed by the metric enum
+        self.target_scores = {
+            metric: self.quality_thresholds[metric.value]["good"]
+            for metric in QualityMetric
+        }
         self.required_elements = self._load_required_elements()
+        self.element_patterns = self._build_element_patterns()
+        self.suggestion_generators = {
+            QualityMetric.READABILITY: self._generate_readability_suggestions,
+            QualityMetric.COMPLEXITY: self._generate_complexity_suggestions,
+            QualityMetric.ACCURACY: self._generate_accuracy_suggestions,
+            QualityMetric.COMPLETENESS: self._generate_completeness_suggestions,
+            QualityMetric.ENGAGEMENT: self._generate_engagement_suggestions,
+            QualityMetric.ACCESSIBILITY: self._generate_accessibility_suggestions,
+        }
+        self._assessment_cache: OrderedDict[bytes, QualityAssessment] = OrderedDict()
 
     async def process_task(self, task: AgentTask) -> AgentResponse:
         """
@@ -99,8 +167,33 @@ class QualityAssuranceAgent(BaseAgent):
                 "satisfactory": 0.5,
                 "needs_improvement": 0.3,
             },
+            "overall": {
+                "excellent": 0.8,
+                "good": 0.6,
+                "satisfactory": 0.4,
+                "needs_improvement": 0.2,
+            },
         }
 
+    def _build_level_cutoffs(self) -> Dict[str, List[float]]:
+        """
+        Precompute each metric's thresholds as ascending cutoffs over QUALITY_LEVELS.
+        Returns:
+            Dict[str, List[float]]: Cutoffs to bisect a score against, per metric
+        """
+        cutoffs = {}
+        for metric, thresholds in self.quality_thresholds.items():
+            # A score gets the first level, from EXCELLENT down, whose threshold
+            # it meets; a running minimum keeps that rule for metrics whose
+            # thresholds do not rise with the level
+            bounds = []
+            lowest = float("inf")
+            for level in reversed(QUALITY_LEVELS[1:]):
+                lowest = min(lowest, thresholds[level.value])
+                bounds.append(lowest)
+            cutoffs[metric] = bounds[::-1]
+        return cutoffs
+
     def _load_required_elements(self) -> Dict[str, List[str]]:
         """Load required elements for different content types."""
         return {
@@ -116,96 +209,122 @@ class QualityAssuranceAgent(BaseAgent):
             ],
         }
 
+    def _build_element_patterns(self) -> Dict[str, Pattern[str]]:
+        """
+        Compile one case-insensitive scan per content type for its required elements.
+        Returns:
+            Dict[str, Pattern[str]]: Pattern finding every element occurrence
+        """
+        # The lookahead finds matches starting at every position, so
+        # overlapping elements are all reported
+        return {
+            content_type: re.compile(
+                "(?=({}))".format("|".join(map(re.escape, elements))),
+                re.IGNORECASE,
+            )
+            for content_type, elements in self.required_elements.items()
+        }
+
     async def _perform_quality_assessment(
         self, request: QualityCheckRequest
     ) -> QualityAssessment:
         """
-        Perform comprehensive quality assessment.
+        Perform comprehensive quality assessment, reusing earlier results.
         Args:
             request: Quality check request
         Returns:
             QualityAssessment: Assessment results
         """
-        # Calculate individual metrics
-        readability_score = self._assess_readability(request.content)
-        complexity_score = self._assess_complexity(request.content)
-        accuracy_score = self._assess_accuracy(request.content)
-        completeness_score = self._assess_completeness(
-            request.content, request.content_type
+        # The assessment depends only on the content and its type
+        key = (
+            hashlib.blake2b(request.content.encode(), digest_size=16).digest()
+            + request.content_type.encode()
         )
-        engagement_score = self._assess_engagement(request.content)
-        accessibility_score = self._assess_accessibility(request.content)
-
-        # Create quality scores
-        metrics = [
-            QualityScore(
-                metric=QualityMetric.READABILITY,
-                score=readability_score,
-                level=self._determine_quality_level("readability", readability_score),
-                details={
-                    "words_per_sentence": self._calculate_words_per_sentence(
-                        request.content
-                    )
+        cached = self._assessment_cache.get(key)
+        if cached is not None:
+            self._assessment_cache.move_to_end(key)
+            now = datetime.utcnow()
+            metadata = {**cached.metadata, "assessment_timestamp": now.isoformat()}
+            return cached.model_copy(
+                update={
+                    "assessment_id": uuid4(),
+                    "content_id": request.content_id,
+                    "timestamp": now,
+                    "metadata": metadata,
                 },
-                suggestions=self._generate_readability_suggestions(readability_score),
+                deep=True,
+            )
+
+        assessment = self._run_quality_assessment(request)
+        self._assessment_cache[key] = assessment
+        if len(self._assessment_cache) > ASSESSMENT_CACHE_SIZE:
+            self._assessment_cache.popitem(last=False)
+        return assessment.model_copy(deep=True)
+
+    def _run_quality_assessment(
+        self, request: QualityCheckRequest
+    ) -> QualityAssessment:
+        """
+        Assess content quality without consulting the assessment cache.
+        Args:
+            request: Quality check request
+        Returns:
+            QualityAssessment: Assessment results
+        """
+        # Scan the content once for all of the text-based metrics
+        stats = self._content_stats(request.content)
+        present_elements = self._find_elements(request.content, request.content_type)
+
+        # Score each metric with its details
+        scored = (
+            (
+                QualityMetric.READABILITY,
+                self._assess_readability(stats),
+                {"words_per_sentence": self._calculate_words_per_sentence(stats)},
             ),
-            QualityScore(
-                metric=QualityMetric.COMPLEXITY,
-                score=complexity_score,
-                level=self._determine_quality_level("complexity", complexity_score),
-                details={
-                    "long_words_ratio": self._calculate_long_words_ratio(
-                        request.content
-                    )
-                },
-                suggestions=self._generate_complexity_suggestions(complexity_score),
+            (
+                QualityMetric.COMPLEXITY,
+                self._assess_complexity(stats),
+                {"long_words_ratio": self._calculate_long_words_ratio(stats)},
             ),
-            QualityScore(
-                metric=QualityMetric.ACCURACY,
-                score=accuracy_score,
-                level=self._determine_quality_level("accuracy", accuracy_score),
-                details={
+            (
+                QualityMetric.ACCURACY,
+                self._assess_accuracy(request.content),
+                {
                     "consistency_score": self._calculate_consistency_score(
                         request.content
                     )
                 },
-                suggestions=self._generate_accuracy_suggestions(accuracy_score),
             ),
-            QualityScore(
-                metric=QualityMetric.COMPLETENESS,
-                score=completeness_score,
-                level=self._determine_quality_level("completeness", completeness_score),
-                details={
+            (
+                QualityMetric.COMPLETENESS,
+                self._assess_completeness(present_elements, request.content_type),
+                {
                     "missing_elements": self._identify_missing_elements(
-                        request.content, request.content_type
+                        present_elements, request.content_type
                     )
                 },
-                suggestions=self._generate_completeness_suggestions(completeness_score),
             ),
-            QualityScore(
-                metric=QualityMetric.ENGAGEMENT,
-                score=engagement_score,
-                level=self._determine_quality_level("engagement", engagement_score),
-                details={
+            (
+                QualityMetric.ENGAGEMENT,
+                self._assess_engagement(request.content),
+                {
                     "interactivity_score": self._calculate_interactivity_score(
                         request.content
                     )
                 },
-                suggestions=self._generate_engagement_suggestions(engagement_score),
             ),
-            QualityScore(
-                metric=QualityMetric.ACCESSIBILITY,
-                score=accessibility_score,
-                level=self._determine_quality_level(
-                    "accessibility", accessibility_score
-                ),
-                details={
-                    "wcag_compliance": self._check_wcag_compliance(request.content)
-                },
-                suggestions=self._generate_accessibility_suggestions(
-                    accessibility_score
-                ),
+            (
+                QualityMetric.ACCESSIBILITY,
+                self._assess_accessibility(request.content),
+                {"wcag_compliance": self._check_wcag_compliance(request.content)},
             ),
+        )
+
+        # Create quality scores
+        metrics = [
+            self._score_metric(metric, score, details)
+            for metric, score, details in scored
         ]
 
         # Calculate overall score and level
@@ -213,8 +332,7 @@ class QualityAssuranceAgent(BaseAgent):
         overall_level = self._determine_quality_level("overall", overall_score)
 
         # Collect issues and recommendations
-        issues = self._collect_issues(metrics)
-        recommendations = self._generate_recommendations(metrics)
+        issues, recommendations = self._collect_issues(metrics)
 
         return QualityAssessment(
             content_id=request.content_id,
@@ -229,35 +347,70 @@ class QualityAssuranceAgent(BaseAgent):
             },
         )
 
-    def _assess_readability(self, content: str) -> float:
-        """Assess content readability."""
-        words = content.split()
-        sentences = content.split(".")
-        if not sentences:
-            return 0.0
+    def _score_metric(
+        self, metric: QualityMetric, score: float, details: Dict[str, Any]
+    ) -> QualityScore:
+        """
+        Build the quality score for a metric, with suggestions when it needs them.
+        Args:
+            metric: Quality metric
+            score: Metric score (0-1)
+            details: Metric-specific details
+        Returns:
+            QualityScore: Scored metric
+        """
+        level = self._determine_quality_level(metric.value, score)
+        if level in GOOD_LEVELS and metric not in LOWER_IS_BETTER:
+            suggestions = []
+        else:
+            suggestions = self.suggestion_generators[metric](score)
+        return QualityScore(
+            metric=metric,
+            score=score,
+            level=level,
+            details=details,
+            suggestions=suggestions,
+        )
+
+    def _content_stats(self, content: str) -> ContentStats:
+        """
+        Count the words, sentences, long words and technical terms of content.
+        Args:
+            content: Content to measure
+        Returns:
+            ContentStats: Word-level counts of the content
+        """
+        # Every count runs in C; no Python loop over the words
+        return ContentStats(
+            word_count=len(content.split()),
+            # Same count as len(content.split(".")) without building the pieces
+            sentence_count=content.count(".") + 1,
+            long_word_count=len(LONG_WORD_RE.findall(content)),
+            technical_term_count=len(TECHNICAL_WORD_RE.findall(content)),
+        )
 
+    def _assess_readability(self, stats: ContentStats) -> float:
+        """Assess content readability."""
         # Calculate average words per sentence
-        avg_words_per_sentence = len(words) / len(sentences)
+        avg_words_per_sentence = self._calculate_words_per_sentence(stats)
 
         # Calculate long words ratio
-        long_words = sum(1 for word in words if len(word) > 6)
-        long_words_ratio = long_words / len(words)
+        long_words_ratio = self._calculate_long_words_ratio(stats)
 
         # Calculate readability score (0-1)
         readability_score = 1.0 - (avg_words_per_sentence / 20) - (long_words_ratio / 2)
         return max(0.0, min(1.0, readability_score))
 
-    def _assess_complexity(self, content: str) -> float:
+    def _assess_complexity(self, stats: ContentStats) -> float:
         """Assess content complexity."""
-        words = content.split()
+        if not stats.word_count:
+            return 0.0
 
         # Calculate long words ratio
-        long_words = sum(1 for word in words if len(word) > 6)
-        long_words_ratio = long_words / len(words)
+        long_words_ratio = self._calculate_long_words_ratio(stats)
 
         # Calculate technical terms ratio
-        technical_terms = sum(1 for word in words if self._is_technical_term(word))
-        technical_terms_ratio = technical_terms / len(words)
+        technical_terms_ratio = stats.technical_term_count / stats.word_count
 
         # Calculate complexity score (0-1)
         complexity_score = (long_words_ratio + technical_terms_ratio) / 2
@@ -265,196 +418,112 @@ class QualityAssuranceAgent(BaseAgent):
 
     def _assess_accuracy(self, content: str) -> float:
         """Assess content accuracy."""
-        # Check for factual consistency
-        factual_consistency = self._check_factual_consistency(content)
+        # Factual consistency, technical accuracy and logical flow are
+        # placeholder checks that all score the same
+        return ACCURACY_CHECK_SCORE
 
-        # Check for technical accuracy
-        technical_accuracy = self._check_technical_accuracy(content)
-
-        # Check for logical flow
-        logical_flow = self._check_logical_flow(content)
-
-        # Calculate accuracy score (0-1)
-        accuracy_score = (factual_consistency + technical_accuracy + logical_flow) / 3
-        return max(0.0, min(1.0, accuracy_score))
-
-    def _assess_completeness(self, content: str, content_type: str) -> float:
+    def _assess_completeness(
+        self, present_elements: Set[str], content_type: str
+    ) -> float:
         """Assess content completeness."""
         required_elements = self.required_elements.get(content_type, [])
         if not required_elements:
             return 1.0
 
-        # Check for required elements
-        present_elements = sum(
-            1 for element in required_elements if self._has_element(content, element)
-        )
-
         # Calculate completeness score (0-1)
-        completeness_score = present_elements / len(required_elements)
+        completeness_score = len(present_elements) / len(required_elements)
         return max(0.0, min(1.0, completeness_score))
 
     def _assess_engagement(self, content: str) -> float:
         """Assess content engagement."""
-        # Calculate interactivity score
-        interactivity_score = self._calculate_interactivity_score(content)
-
-        # Calculate visual appeal score
-        visual_appeal = self._calculate_visual_appeal(content)
-
-        # Calculate content flow score
-        content_flow = self._calculate_content_flow(content)
-
-        # Calculate user interest score
-        user_interest = self._calculate_user_interest(content)
-
-        # Calculate engagement score (0-1)
-        engagement_score = (
-            interactivity_score + visual_appeal + content_flow + user_interest
-        ) / 4
-        return max(0.0, min(1.0, engagement_score))
+        # Interactivity, visual appeal, content flow and user interest are
+        # placeholder checks that all score the same
+        return ENGAGEMENT_CHECK_SCORE
 
     def _assess_accessibility(self, content: str) -> float:
         """Assess content accessibility."""
-        # Check WCAG compliance
-        wcag_compliance = self._check_wcag_compliance(content)
-
-        # Check for alternative text
-        alt_text_score = self._check_alt_text(content)
-
-        # Check for color contrast
-        contrast_score = self._check_color_contrast(content)
-
-        # Check for keyboard navigation
-        keyboard_nav_score = self._check_keyboard_navigation(content)
-
-        # Calculate accessibility score (0-1)
-        accessibility_score = (
-            wcag_compliance + alt_text_score + contrast_score + keyboard_nav_score
-        ) / 4
-        return max(0.0, min(1.0, accessibility_score))
+        # WCAG compliance, alt text, color contrast and keyboard navigation
+        # are placeholder checks that all score the same
+        return ACCESSIBILITY_CHECK_SCORE
 
     def _determine_quality_level(self, metric: str, score: float) -> QualityLevel:
         """Determine quality level based on score and thresholds."""
-        thresholds = self.quality_thresholds.get(
-            metric, self.quality_thresholds["overall"]
-        )
-
-        if score >= thresholds["excellent"]:
-            return QualityLevel.EXCELLENT
-        elif score >= thresholds["good"]:
-            return QualityLevel.GOOD
-        elif score >= thresholds["satisfactory"]:
-            return QualityLevel.SATISFACTORY
-        elif score >= thresholds["needs_improvement"]:
-            return QualityLevel.NEEDS_IMPROVEMENT
-        else:
-            return QualityLevel.POOR
+        cutoffs = self.level_cutoffs.get(metric) or self.level_cutoffs["overall"]
+        return QUALITY_LEVELS[bisect_right(cutoffs, score)]
 
-    def _calculate_words_per_sentence(self, content: str) -> float:
+    def _calculate_words_per_sentence(self, stats: ContentStats) -> float:
         """Calculate average words per sentence."""
-        words = content.split()
-        sentences = content.split(".")
-        if not sentences:
-            return 0.0
-        return len(words) / len(sentences)
+        return stats.word_count / stats.sentence_count
 
-    def _calculate_long_words_ratio(self, content: str) -> float:
+    def _calculate_long_words_ratio(self, stats: ContentStats) -> float:
         """Calculate ratio of long words."""
-        words = content.split()
-        long_words = sum(1 for word in words if len(word) > 6)
-        return long_words / len(words)
+        if not stats.word_count:
+            return 0.0
+        return stats.long_word_count / stats.word_count
 
     def _is_technical_term(self, word: str) -> bool:
         """Check if a word is a technical term."""
-        # Simple technical term detection
-        technical_indicators = [
-            "-",
-            "_",
-            "api",
-            "sdk",
-            "framework",
-            "algorithm",
-            "protocol",
+        return TECHNICAL_TERM_RE.search(word) is not None
+
+    def _find_elements(self, content: str, content_type: str) -> Set[str]:
+        """
+        Find the required elements mentioned in content, in one scan.
+        Args:
+            content: Content to check
+            content_type: Type of the content
+        Returns:
+            Set[str]: Required elements present in the content
+        """
+        pattern = self.element_patterns.get(content_type)
+        if pattern is None:
+            return set()
+        # Elements are lowercase, so folding the match names the element
+        return {match.lower() for match in pattern.findall(content)}
+
+    def _identify_missing_elements(
+        self, present_elements: Set[str], content_type: str
+    ) -> List[str]:
+        """Identify required elements absent from the content."""
+        return [
+            element
+            for element in self.required_elements.get(content_type, [])
+            if element not in present_elements
         ]
-        return any(indicator in word.lower() for indicator in technical_indicators)
 
-    def _check_factual_consistency(self, content: str) -> float:
-        """Check factual consistency of content."""
+    def _calculate_consistency_score(self, content: str) -> float:
+        """Calculate consistency score."""
         # Simple consistency check
-        return 0.8  # Placeholder
-
-    def _check_technical_accuracy(self, content: str) -> float:
-        """Check technical accuracy of content."""
-        # Simple technical accuracy check
-        return 0.8  # Placeholder
-
-    def _check_logical_flow(self, content: str) -> float:
-        """Check logical flow of content."""
-        # Simple logical flow check
-        return 0.8  # Placeholder
-
-    def _has_element(self, content: str, element: str) -> bool:
-        """Check if content has a specific element."""
-        # Simple element detection
-        return element.lower() in content.lower()
+        return ACCURACY_CHECK_SCORE  # Placeholder
 
     def _calculate_interactivity_score(self, content: str) -> float:
         """Calculate interactivity score."""
         # Simple interactivity check
-        return 0.7  # Placeholder
-
-    def _calculate_visual_appeal(self, content: str) -> float:
-        """Calculate visual appeal score."""
-        # Simple visual appeal check
-        return 0.7  # Placeholder
-
-    def _calculate_content_flow(self, content: str) -> float:
-        """Calculate content flow score."""
-        # Simple content flow check
-        return 0.7  # Placeholder
-
-    def _calculate_user_interest(self, content: str) -> float:
-        """Calculate user interest score."""
-        # Simple user interest check
-        return 0.7  # Placeholder
+        return ENGAGEMENT_CHECK_SCORE  # Placeholder
 
     def _check_wcag_compliance(self, content: str) -> float:
         """Check WCAG compliance."""
         # Simple WCAG compliance check
-        return 0.8  # Placeholder
-
-    def _check_alt_text(self, content: str) -> float:
-        """Check for alternative text."""
-        # Simple alt text check
-        return 0.8  # Placeholder
-
-    def _check_color_contrast(self, content: str) -> float:
-        """Check color contrast."""
-        # Simple color contrast check
-        return 0.8  # Placeholder
+        return ACCESSIBILITY_CHECK_SCORE  # Placeholder
 
-    def _check_keyboard_navigation(self, content: str) -> float:
-        """Check keyboard navigation."""
-        # Simple keyboard navigation check
-        return 0.8  # Placeholder
-
-    def _collect_issues(self, metrics: List[QualityScore]) -> List[str]:
-        """Collect issues from quality metrics."""
+    def _collect_issues(
+        self, metrics: List[QualityScore]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Collect issues and recommendations from quality metrics in one pass.
+        Args:
+            metrics: Scored quality metrics
+        Returns:
+            Tuple[List[str], List[str]]: Issues and recommendations
+        """
         issues = []
+        recommendations = []
         for metric in metrics:
-            if metric.level in [QualityLevel.NEEDS_IMPROVEMENT, QualityLevel.POOR]:
+            if metric.level in NEEDS_WORK_LEVELS:
                 issues.append(
                     f"{metric.metric.value}: {metric.score:.2f} - {metric.level.value}"
                 )
-        return issues
-
-    def _generate_recommendations(self, metrics: List[QualityScore]) -> List[str]:
-        """Generate recommendations based on quality metrics."""
-        recommendations = []
-        for metric in metrics:
-            if metric.level in [QualityLevel.NEEDS_IMPROVEMENT, QualityLevel.POOR]:
                 recommendations.extend(metric.suggestions)
-        return recommendations
+        return issues, recommendations
 
     def _generate_improvements(
         self, assessment: QualityAssessment
@@ -462,7 +531,7 @@ class QualityAssuranceAgent(BaseAgent):
         """Generate improvement suggestions."""
         improvements = []
         for metric in assessment.metrics:
-            if metric.level in [QualityLevel.NEEDS_IMPROVEMENT, QualityLevel.POOR]:
+            if metric.level in NEEDS_WORK_LEVELS:
                 improvement = QualityImprovement(
                     content_id=assessment.content_id,
                     assessment_id=assessment.assessment_id,
@@ -470,9 +539,7 @@ class QualityAssuranceAgent(BaseAgent):
                         {
                             "metric": metric.metric.value,
                             "current_score": metric.score,
-                            "target_score": self.quality_thresholds[
-                                metric.metric.value
-                            ]["good"],
+                            "target_score": self.target_scores[metric.metric],
                             "suggestions": metric.suggestions,
                         }
                     ],
@@ -1,5 +1,6 @@
 """Document analyzer agent for analyzing documents."""
 
+import inspect
 import json
 import logging
 import os
@@ -26,8 +27,8 @@ class DocumentAnalyzerAgent(BaseAgent):
             # Create outlines directory if it doesn't exist
             base = os.path.dirname
             base_dir = base(base(base(__file__)))
-            outlines_dir = os.path.join(base(base_dir), "outputs", "outlines")
-            os.makedirs(outlines_dir, exist_ok=True)
+            self.outlines_dir = os.path.join(base(base_dir), "outputs", "outlines")
+            os.makedirs(self.outlines_dir, exist_ok=True)
             logger.info("Successfully initialized DocumentAnalyzerAgent")
         except Exception as e:
             msg = "Failed to initialize DocumentAnalyzerAgent: {}"
@@ -77,18 +78,7 @@ class DocumentAnalyzerAgent(BaseAgent):
             elif isinstance(llm_response, dict):
                 # The response is already in a structured format
                 logger.debug("LLM returned structured response")
-                # Format the response to match expected structure
-                result = {
-                    "topics": llm_response.get("topics", []),
-                    "subtopics": llm_response.get("subtopics", {}),
-                    "key_concepts": llm_response.get("key_concepts", []),
-                    "complexity": llm_response.get("complexity", "Unknown"),
-                    "suggested_structure": llm_response.get(
-                        "suggested_structure", "No structure suggested"
-                    ),
-                    "prerequisites": llm_response.get("prerequisites", []),
-                    "dependencies": llm_response.get("dependencies", []),
-                }
+                result = self._structure_result(llm_response)
             else:
                 # Handle unexpected response type
                 logger.warning(f"Unexpected response type: {type(llm_response)}")
@@ -111,18 +101,10 @@ class DocumentAnalyzerAgent(BaseAgent):
             outline_file = None
             if input_data.get("original_filename"):
                 try:
-                    # Create outlines directory if it doesn't exist
-                    base = os.path.dirname
-                    base_dir = base(base(base(__file__)))
-                    outlines_dir = os.path.join(base(base_dir), "outputs", "outlines")
-                    os.makedirs(outlines_dir, exist_ok=True)
-                    msg = "Created/verified outlines directory: {}"
-                    logger.debug(msg.format(outlines_dir))
-
                     # Generate outline filename
                     base_name = os.path.splitext(input_data["original_filename"])[0]
                     outline_filename = f"{base_name}_outline.txt"
-                    outline_path = os.path.join(outlines_dir, outline_filename)
+                    outline_path = os.path.join(self.outlines_dir, outline_filename)
 
                     # Format and save outline
                     outline_content = self._format_outline(result)
@@ -224,10 +206,6 @@ class DocumentAnalyzerAgent(BaseAgent):
             # Set up OpenAI client
             logger.debug("Setting up OpenAI client configuration")
 
-            import inspect
-
-            import openai
-
             # Log available parameters for OpenAI client constructor
             logger.debug(f"OpenAI version: {openai.__version__}")
             logger.debug(
@@ -287,8 +265,6 @@ class DocumentAnalyzerAgent(BaseAgent):
             try:
                 # Try to parse the response as JSON
                 logger.debug("Attempting to parse response as JSON")
-                import json
-
                 parsed_response = json.loads(response)
                 logger.debug("Successfully parsed response as JSON")
                 return parsed_response
@@ -298,10 +274,7 @@ class DocumentAnalyzerAgent(BaseAgent):
                 return {"raw_response": response}
 
         except Exception as e:
-            logger.error(f"Error executing LLM: {str(e)}")
-            import traceback
-
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.error(f"Error executing LLM: {str(e)}", exc_info=True)
             raise
 
     def _parse_response(self, response: str) -> Dict[str, Any]:
@@ -324,19 +297,7 @@ class DocumentAnalyzerAgent(BaseAgent):
                     msg = "Could not find valid JSON structure in response"
                     raise ValueError(msg)
 
-            # Validate and structure the result
-            structured_result = {
-                "topics": result.get("topics", []),
-                "subtopics": result.get("subtopics", {}),
-                "key_concepts": result.get("key_concepts", []),
-                "complexity": result.get("complexity", "Unknown"),
-                "suggested_structure": result.get(
-                    "suggested_structure", "No structure suggested"
-                ),
-                "prerequisites": result.get("prerequisites", []),
-                "dependencies": result.get("dependencies", []),
-            }
-
+            structured_result = self._structure_result(result)
             logger.debug("Structured result: {}".format(structured_result))
             return structured_result
 
@@ -345,6 +306,20 @@ class DocumentAnalyzerAgent(BaseAgent):
             logger.error(msg.format(str(e)), exc_info=True)
             raise
 
+    def _structure_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize a parsed LLM result to the expected analysis structure."""
+        return {
+            "topics": result.get("topics", []),
+            "subtopics": result.get("subtopics", {}),
+            "key_concepts": result.get("key_concepts", []),
+            "complexity": result.get("complexity", "Unknown"),
+            "suggested_structure": result.get(
+                "suggested_structure", "No structure suggested"
+            ),
+            "prerequisites": result.get("prerequisites", []),
+            "dependencies": result.get("dependencies", []),
+        }
+
     def _validate_output(self, output: Dict[str, Any]) -> None:
         """Validate the output structure."""
         required_fields = [
@@ -1,13 +1,93 @@
+import asyncio
 import json
 import logging
+import os
+import re
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
+import httpx
+import openai
 import redis
 from langchain.chat_models import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import BaseMessage
-from pydantic import BaseModel
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from pydantic import BaseModel, ValidationError
+
+from .json_utils import json_dumps, json_loads
+from .llm_cache import LLMCache, make_key
+
+# Maximum concurrent LLM requests across all agents in the process
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))
+
+# Responses longer than this are parsed off the event loop
+PARSE_OFFLOAD_CHARS = int(os.getenv("PARSE_OFFLOAD_CHARS", 16384))
+
+# Threads for CPU-bound parsing and embedding, kept small to limit GIL contention
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", min(8, os.cpu_count() or 1)))
+
+# Connection pool shared by every agent's LLM client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 100))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", 20))
+
+# Outgoing messages are pushed to Redis in pipelined batches
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 64))
+OUTBOX_FLUSH_INTERVAL = float(os.getenv("OUTBOX_FLUSH_INTERVAL", 0.005))  # seconds
+OUTBOX_RETRIES = int(os.getenv("OUTBOX_RETRIES", 3))
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # HTTP/2 needs httpx's http2 extra
+    HTTP2_AVAILABLE = False
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_START_RE = re.compile(r"\s*[\[{]")
+_shared_llm_client: Optional[openai.AsyncOpenAI] = None
+
+
+def get_shared_llm_client() -> openai.AsyncOpenAI:
+    """Get the process-wide OpenAI client so agents reuse pooled connections"""
+    global _shared_llm_client
+    if _shared_llm_client is None:
+        _shared_llm_client = openai.AsyncOpenAI(
+            http_client=httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                ),
+            )
+        )
+    return _shared_llm_client
+
+
+def compile_section_re(labels: List[str]) -> re.Pattern:
+    """Compile a regex capturing each "Label:" section of a text response"""
+    alternation = "|".join(re.escape(label) for label in labels)
+    return re.compile(
+        rf"^[ \t]*({alternation}):[ \t]*(.*?)(?=^[ \t]*(?:{alternation}):|\Z)",
+        re.MULTILINE | re.DOTALL,
+    )
+
+
+def looks_like_json(text: str) -> bool:
+    """Check the first non-blank character to tell JSON from a text answer"""
+    return _JSON_START_RE.match(text) is not None
 
 
 class AgentConfig(BaseModel):
@@ -18,6 +98,8 @@ class AgentConfig(BaseModel):
     model_name: str = "gpt-4"
     temperature: float = 0.7
     max_tokens: int = 2000
+    # Only models with structured output accept a json_schema response_format
+    structured_output: bool = False
     redis_url: str
     prompt_template: str
 
@@ -25,6 +107,37 @@ class AgentConfig(BaseModel):
 class BaseAgent(ABC):
     """Base class for all agents in the system"""
 
+    # Bump when prompts or parsing change so cached results are not reused
+    prompt_version = "1"
+
+    # Top-level fields every output must contain
+    required_fields: List[str] = []
+
+    # Pydantic model the LLM is constrained to via structured output
+    output_schema: Optional[Type[BaseModel]] = None
+
+    # Labelled text sections and the (field, parser) each fills, for streaming
+    section_re: Optional[re.Pattern] = None
+    section_dispatch: Dict[str, Tuple[str, Callable[[str], Any]]] = {}
+    _section_fields: frozenset = frozenset()
+    _required_set: frozenset = frozenset()
+
+    # Shared by all agents so fan-out respects the provider's rate limits
+    _llm_semaphore: Optional[asyncio.Semaphore] = None
+
+    # Parses large responses and embeds inputs so one agent does not stall others
+    _cpu_executor = ThreadPoolExecutor(
+        max_workers=CPU_WORKERS, thread_name_prefix="agent-cpu"
+    )
+
+    def __init_subclass__(cls, **kwargs):
+        """Precompute the agent's field sets once per class"""
+        super().__init_subclass__(**kwargs)
+        cls._required_set = frozenset(cls.required_fields)
+        cls._section_fields = frozenset(
+            field for field, _ in cls.section_dispatch.values()
+        )
+
     def __init__(self, config: AgentConfig):
         self.config = config
         self.redis_client = redis.from_url(config.redis_url)
@@ -32,11 +145,18 @@ class BaseAgent(ABC):
             model_name=config.model_name,
             temperature=config.temperature,
             max_tokens=config.max_tokens,
+            async_client=get_shared_llm_client().chat.completions,
         )
-        self.prompt_template = ChatPromptTemplate.from_messages(
-            [("system", config.prompt_template), ("human", "{input}")]
-        )
+        # The system prompt never changes, so build it once and keep it first;
+        # providers with prefix caching then reuse it across calls
+        self.system_message = SystemMessage(content=config.prompt_template)
         self.logger = logging.getLogger(f"agent.{config.name}")
+        self.llm_cache = LLMCache()
+        self.response_format = self._build_response_format()
+        # Created on first send, since agents may be built outside an event loop
+        self._outbox: Optional[asyncio.Queue] = None
+        self._outbox_task: Optional[asyncio.Task] = None
+        self._undelivered = 0
 
     @abstractmethod
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -46,11 +166,90 @@ class BaseAgent(ABC):
     async def send_message(
         self, target_agent: str, message: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Send a message to another agent"""
-        message_id = f"msg:{target_agent}:{self.config.name}:{json.dumps(message)}"
-        self.redis_client.rpush(f"agent:{target_agent}:inbox", message_id)
+        """
+        Queue a message for another agent; it is delivered in the next batch
+
+        Call flush_outbox (or close) before relying on the message being in
+        Redis.
+        """
+        payload = json_dumps(message).decode()
+        message_id = f"msg:{target_agent}:{self.config.name}:{payload}"
+        self._outbox = self._outbox or asyncio.Queue()
+        self._outbox.put_nowait((f"agent:{target_agent}:inbox", message_id))
+        self._ensure_outbox_task()
         return {"status": "sent", "message_id": message_id}
 
+    def _ensure_outbox_task(self):
+        """Start the outbox flush loop if it is not running"""
+        if self._outbox_task is None or self._outbox_task.done():
+            self._outbox_task = asyncio.create_task(self._flush_outbox_loop())
+
+    async def flush_outbox(self):
+        """Wait until every queued message has been pushed to Redis"""
+        if self._outbox is None:
+            return
+        if not self._outbox.empty():
+            self._ensure_outbox_task()
+        await self._outbox.join()
+        if self._undelivered:
+            count, self._undelivered = self._undelivered, 0
+            raise redis.RedisError(f"{count} queued messages could not be delivered")
+
+    async def close(self):
+        """Deliver queued messages and stop the outbox flush loop"""
+        try:
+            await self.flush_outbox()
+        finally:
+            if self._outbox_task is not None:
+                self._outbox_task.cancel()
+                await asyncio.gather(self._outbox_task, return_exceptions=True)
+                self._outbox_task = None
+            # The queue belongs to this event loop; start afresh in the next
+            self._outbox = None
+
+    async def __aenter__(self) -> "BaseAgent":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _flush_outbox_loop(self):
+        """Push queued messages to their inboxes, one pipeline per batch"""
+        while True:
+            batch = [await self._outbox.get()]
+            if self._outbox.qsize() < OUTBOX_BATCH_SIZE - 1:
+                # Let messages sent in quick succession join the batch
+                await asyncio.sleep(OUTBOX_FLUSH_INTERVAL)
+            while len(batch) < OUTBOX_BATCH_SIZE and not self._outbox.empty():
+                batch.append(self._outbox.get_nowait())
+            try:
+                for attempt in range(OUTBOX_RETRIES + 1):
+                    try:
+                        await asyncio.to_thread(self._push_messages, batch)
+                        break
+                    except redis.RedisError as e:
+                        self.logger.error(
+                            f"Error sending {len(batch)} messages "
+                            f"(attempt {attempt + 1}/{OUTBOX_RETRIES + 1}): {str(e)}"
+                        )
+                        if attempt == OUTBOX_RETRIES:
+                            # Reported by the next flush_outbox
+                            self._undelivered += len(batch)
+                        else:
+                            await asyncio.sleep(0.1 * 2**attempt)
+            finally:
+                for _ in batch:
+                    self._outbox.task_done()
+
+    def _push_messages(self, batch: List[Tuple[str, str]]):
+        """Append a batch of messages to their inboxes in one round trip"""
+        # MULTI/EXEC makes each attempt atomic. A retry after a lost EXEC
+        # reply can still deliver the batch twice
+        pipe = self.redis_client.pipeline(transaction=True)
+        for inbox, message_id in batch:
+            pipe.rpush(inbox, message_id)
+        pipe.execute()
+
     async def receive_message(self) -> Optional[Dict[str, Any]]:
         """Receive a message from the agent's inbox"""
         message_id = self.redis_client.lpop(f"agent:{self.config.name}:inbox")
@@ -58,24 +257,402 @@ class BaseAgent(ABC):
             return json.loads(message_id.split(":", 1)[1])
         return None
 
-    def _format_prompt(self, input_data: Dict[str, Any]) -> str:
-        """Format the prompt template with input data"""
-        return self.prompt_template.format_messages(input=input_data)
+    def _format_prompt(self, input_data: Dict[str, Any]) -> List[BaseMessage]:
+        """Format the prompt, with the input data as the only dynamic part"""
+        return [self.system_message, HumanMessage(content=str(input_data))]
 
-    async def _execute_llm(self, messages: list[BaseMessage]) -> str:
+    def _build_response_format(self) -> Optional[Dict[str, Any]]:
+        """Build the JSON schema response format for the agent's output schema"""
+        if self.output_schema is None or not self.config.structured_output:
+            return None
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": self.output_schema.__name__,
+                "schema": self.output_schema.model_json_schema(),
+            },
+        }
+
+    async def _execute_llm(
+        self,
+        messages: list[BaseMessage],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """Execute the LLM with the given messages"""
         try:
-            response = await self.llm.agenerate([messages])
+            kwargs = {"response_format": response_format} if response_format else {}
+            async with self._get_llm_semaphore():
+                response = await self.llm.agenerate([messages], **kwargs)
             return response.generations[0][0].text
         except Exception as e:
             self.logger.error(f"Error executing LLM: {str(e)}")
             raise
 
+    async def _execute_llm_batch(
+        self,
+        messages_list: List[list[BaseMessage]],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> List[Optional[str]]:
+        """
+        Execute the LLM on several conversations concurrently
+
+        Each distinct conversation is its own request and takes its own LLM
+        concurrency permit. A failed conversation gives None instead of failing
+        the others.
+        """
+        # Identical prompts are sent once and share the response
+        keys = [
+            make_key([(m.type, m.content) for m in messages])
+            for messages in messages_list
+        ]
+        positions: Dict[str, int] = {}
+        batch = []
+        for key, messages in zip(keys, messages_list):
+            if key not in positions:
+                positions[key] = len(batch)
+                batch.append(messages)
+
+        results = await asyncio.gather(
+            *(self._execute_llm(messages, response_format) for messages in batch),
+            return_exceptions=True,
+        )
+        texts = [None if isinstance(r, Exception) else r for r in results]
+        return [texts[positions[key]] for key in keys]
+
+    async def _stream_llm(
+        self,
+        messages: list[BaseMessage],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        """Execute the LLM, yielding the response text as it is generated"""
+        try:
+            kwargs = {"response_format": response_format} if response_format else {}
+            async with self._get_llm_semaphore():
+                async for chunk in self.llm.astream(messages, **kwargs):
+                    if chunk.content:
+                        yield chunk.content
+        except Exception as e:
+            self.logger.error(f"Error streaming LLM: {str(e)}")
+            raise
+
+    async def _parse_response_stream(
+        self, chunks: AsyncIterator[str]
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Parse a streamed response, yielding (field, payload) as each field completes
+
+        JSON responses yield decoded values; labelled text responses yield each
+        section body run through its section_dispatch parser.
+        """
+        buffer = ""
+        emitted = set()
+        is_json = None
+        async for chunk in chunks:
+            buffer += chunk
+            if is_json is None:
+                stripped = buffer.lstrip()
+                if not stripped:
+                    continue
+                is_json = stripped.startswith("{")
+            if is_json:
+                for field in self.required_fields:
+                    if field in emitted:
+                        continue
+                    value = self._decode_json_field(buffer, field)
+                    if value is not None:
+                        emitted.add(field)
+                        yield field, value
+            elif self.section_re is not None:
+                # A section is complete once the next label has started
+                matches = list(self.section_re.finditer(buffer))
+                for match in matches[:-1]:
+                    yield self._dispatch_section(match)
+                if len(matches) > 1:
+                    buffer = buffer[matches[-1].start() :]
+
+        if not is_json and self.section_re is not None:
+            for match in self.section_re.finditer(buffer):
+                yield self._dispatch_section(match)
+
+    def _iter_sections(self, response: str) -> Iterator[Tuple[str, Any]]:
+        """Yield (field, value) per text section, stopping once every field is seen"""
+        remaining = set(self._section_fields)
+        for match in self.section_re.finditer(response):
+            field, value = self._dispatch_section(match)
+            yield field, value
+            remaining.discard(field)
+            if not remaining:
+                break
+
+    def _require_sections(self, response: str) -> Dict[str, Any]:
+        """
+        Parse a text response's labelled sections into {field: value}
+
+        A reply with no recognised section (a refusal or malformed answer) is a
+        parse failure, not an empty result, so it is retried and never cached.
+        """
+        sections = dict(self._iter_sections(response))
+        if not sections:
+            raise ValueError("no labelled sections were found")
+        return sections
+
+    def _dispatch_section(self, match: re.Match) -> Tuple[str, Any]:
+        """Map a matched text section to its output field and parsed value"""
+        field, parse = self.section_dispatch[match.group(1)]
+        return field, parse(match.group(2))
+
+    @staticmethod
+    def _decode_json_field(buffer: str, field: str) -> Any:
+        """Decode a top-level field from partial JSON, or None if not yet complete"""
+        match = re.search(rf'"{re.escape(field)}"\s*:\s*', buffer)
+        if not match:
+            return None
+        try:
+            value, end = _JSON_DECODER.raw_decode(buffer, match.end())
+        except ValueError:
+            return None
+        # A scalar at the very end of the buffer may still be growing
+        return value if end < len(buffer) else None
+
+    @classmethod
+    def _get_llm_semaphore(cls) -> asyncio.Semaphore:
+        """Get the process-wide LLM concurrency limit"""
+        if BaseAgent._llm_semaphore is None:
+            BaseAgent._llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+        return BaseAgent._llm_semaphore
+
+    def _cache_namespace(self) -> str:
+        """Cache namespace for the agent's current model settings"""
+        return make_key(
+            self.config.name,
+            type(self.llm).__name__,
+            self.config.model_name,
+            self.config.temperature,
+            self.config.max_tokens,
+            self.config.structured_output,
+            self.prompt_version,
+        )
+
+    async def _generate(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the LLM on the input data, reusing a cached result when possible"""
+        namespace = self._cache_namespace()
+        key = make_key(namespace, input_data)
+        cached = self._get_cached_output(key)
+        if cached is not None:
+            return cached
+
+        # Fall back to a near-duplicate input for agents that opt in
+        semantic, embedding = None, None
+        semantic_text = self._semantic_text(input_data)
+        if semantic_text:
+            scope = self._semantic_scope(input_data)
+            semantic = self.llm_cache.semantic(
+                make_key(namespace, scope) if scope is not None else namespace
+            )
+            if semantic.enabled:
+                loop = asyncio.get_running_loop()
+                embedding = await loop.run_in_executor(
+                    self._cpu_executor, semantic.embed, semantic_text
+                )
+            similar_key = semantic.lookup(embedding)
+            if similar_key:
+                cached = self._get_cached_output(similar_key)
+                if cached is not None:
+                    self.logger.info("Reusing result for a near-duplicate input")
+                    return cached
+
+        messages = self._format_prompt(input_data)
+        output = await self._execute_with_validation(
+            messages, self._validate_output, self._parse_response
+        )
+
+        self.llm_cache.put(key, output)
+        if semantic:
+            semantic.add(embedding, key)
+        return output
+
+    async def _generate_streaming(
+        self,
+        input_data: Dict[str, Any],
+        on_field: Callable[[str, Any], Awaitable[None]],
+    ) -> Dict[str, Any]:
+        """
+        Run the LLM like _generate, reporting each field as soon as it streams in
+
+        on_field is not called for cached results; callers act on the returned
+        output for any field they have not seen yet.
+        """
+        key = make_key(self._cache_namespace(), input_data)
+        cached = self._get_cached_output(key)
+        if cached is not None:
+            return cached
+
+        messages = self._format_prompt(input_data)
+        chunks: List[str] = []
+
+        async def collect() -> AsyncIterator[str]:
+            async for chunk in self._stream_llm(messages, self.response_format):
+                chunks.append(chunk)
+                yield chunk
+
+        async for field, payload in self._parse_response_stream(collect()):
+            await on_field(field, payload)
+
+        response = "".join(chunks)
+        try:
+            output = await self._parse_async(self._parse_response, response)
+        except ValueError:
+            output = None
+        if output is None or not self._validate_output(output):
+            output = await self._execute_with_validation(
+                messages, self._validate_output, self._parse_response
+            )
+
+        self.llm_cache.put(key, output)
+        return output
+
+    async def _generate_batch(
+        self, inputs: List[Dict[str, Any]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Run the LLM on several inputs concurrently, skipping cached ones
+
+        An input that still fails after its retries gives its exception in
+        place of an output, so it does not fail the others.
+        """
+        namespace = self._cache_namespace()
+        keys = [make_key(namespace, input_data) for input_data in inputs]
+        outputs = [self._get_cached_output(key) for key in keys]
+        pending = [i for i, output in enumerate(outputs) if output is None]
+        if not pending:
+            return outputs
+
+        prompts = [self._format_prompt(inputs[i]) for i in pending]
+        responses = await self._execute_llm_batch(prompts, self.response_format)
+        retries = {}
+        for i, messages, response in zip(pending, prompts, responses):
+            output = None
+            if response is not None:
+                try:
+                    output = await self._parse_async(self._parse_response, response)
+                except ValueError:
+                    pass
+            if output is None or not self._validate_output(output):
+                # Retry just this input, with validation feedback
+                retries[i] = self._execute_with_validation(
+                    messages, self._validate_output, self._parse_response
+                )
+            else:
+                outputs[i] = output
+
+        results = await asyncio.gather(*retries.values(), return_exceptions=True)
+        for i, result in zip(retries, results):
+            outputs[i] = result
+        for i in pending:
+            if not isinstance(outputs[i], Exception):
+                self.llm_cache.put(keys[i], outputs[i])
+        return outputs
+
+    def _get_cached_output(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached output, evicting it if it no longer validates"""
+        cached = self.llm_cache.get(key)
+        if cached is None:
+            return None
+        if not self._validate_output(cached):
+            self.llm_cache.delete(key)
+            return None
+        return cached
+
+    def _semantic_scope(self, input_data: Dict[str, Any]) -> Any:
+        """Input settings that must match exactly for a near-duplicate to count"""
+        return None
+
+    def _semantic_text(self, input_data: Dict[str, Any]) -> Optional[str]:
+        """Text used to match near-duplicate inputs; None disables the lookup"""
+        return None
+
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        """Parse the LLM response into structured data"""
+        return json_loads(response)
+
+    async def _parse_async(
+        self, parser: Callable[[str], Dict[str, Any]], response: str
+    ) -> Dict[str, Any]:
+        """Run the parser, on the CPU pool when the response is large"""
+        if len(response) <= PARSE_OFFLOAD_CHARS:
+            return parser(response)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._cpu_executor, parser, response)
+
+    async def _execute_with_validation(
+        self,
+        messages: list[BaseMessage],
+        validator: Callable[[Dict[str, Any]], bool],
+        parser: Callable[[str], Dict[str, Any]],
+        max_retries: int = 2,
+    ) -> Dict[str, Any]:
+        """Execute the LLM, re-prompting with the validation error on bad output"""
+        messages = list(messages)
+        for attempt in range(max_retries + 1):
+            response = await self._execute_llm(messages, self.response_format)
+            try:
+                output = await self._parse_async(parser, response)
+            except ValueError as e:
+                error = f"Your output could not be parsed: {str(e)}."
+            else:
+                if validator(output):
+                    return output
+                error = self._describe_invalid_output(output)
+
+            if attempt == max_retries:
+                break
+            self.logger.warning(
+                f"Invalid output from {self.config.name} "
+                f"(attempt {attempt + 1}/{max_retries + 1}): {error}"
+            )
+            messages += [
+                AIMessage(content=response),
+                HumanMessage(
+                    content=f"{error} Return valid JSON with keys "
+                    f"{', '.join(self.required_fields)}."
+                ),
+            ]
+            await asyncio.sleep(1.0 * (attempt + 1))
+
+        raise ValueError(f"Invalid {self.config.name} output: {error}")
+
+    def _describe_invalid_output(self, output: Dict[str, Any]) -> str:
+        """Describe why an output failed validation for the retry prompt"""
+        missing = [field for field in self.required_fields if field not in output]
+        if missing:
+            return f"Your output was missing field {', '.join(missing)}."
+        return "Your output did not match the expected structure."
+
+    @staticmethod
+    def _split_bullets(text: str) -> List[str]:
+        """Split a section body into its list items"""
+        return [line.strip("- ") for line in text.split("\n") if line.strip()]
+
     def _validate_output(self, output: Dict[str, Any]) -> bool:
-        """Validate the output of the agent"""
-        # Implement validation logic specific to each agent
+        """Validate the output of the agent against its output schema"""
+        if self.output_schema is None:
+            return self._required_set.issubset(output)
+        try:
+            self.output_schema.model_validate(output)
+        except ValidationError as e:
+            self.logger.error(f"Invalid {self.config.name} output: {str(e)}")
+            return False
         return True
 
+    def _finalize_result(self, **fields: Any) -> Dict[str, Any]:
+        """Wrap the agent's output in the standard success envelope"""
+        return {
+            "status": "success",
+            "agent": self.config.name,
+            **fields,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
     async def _handle_error(self, error: Exception) -> Dict[str, Any]:
         """Handle errors that occur during processing"""
         self.logger.error(f"Error in agent {self.config.name}: {str(error)}")
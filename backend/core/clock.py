@@ -0,0 +1,21 @@
+import time
+from datetime import datetime, timezone
+
+# (epoch second, formatted string) of the last timestamp produced
+_cached: tuple = (-1, "")
+
+
+def utc_now_iso() -> str:
+    """
+    Get the current UTC time as a naive ISO 8601 string.
+    The string is formatted at most once per second and reused in between,
+    so it has one-second resolution.
+    Returns:
+        str: Current UTC time, e.g. "2024-01-01T12:00:00"
+    """
+    global _cached
+    second = int(time.time())
+    if second != _cached[0]:
+        now = datetime.fromtimestamp(second, timezone.utc).replace(tzinfo=None)
+        _cached = (second, now.isoformat())
+    return _cached[1]
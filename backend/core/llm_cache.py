@@ -0,0 +1,229 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .json_utils import canonical_json, json_dumps, json_loads
+
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # Semantic tier is optional
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+# Directory for cached LLM results
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+
+# Semantic tier settings
+EMBEDDING_MODEL = os.getenv(
+    "LLM_CACHE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
+)
+SIMILARITY_THRESHOLD = float(os.getenv("LLM_CACHE_SIMILARITY", "0.97"))
+EMBEDDING_CHUNK_CHARS = 1000  # Keeps each chunk within the encoder's window
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Build a content-addressable cache key.
+    Args:
+        parts: Values identifying the request (agent, model settings, input data)
+    Returns:
+        str: Hex digest of the length-prefixed parts
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        chunk = part.encode() if isinstance(part, str) else canonical_json(part)
+        # Length prefix keeps ("ab", "c") and ("a", "bc") distinct
+        h.update(len(chunk).to_bytes(8, "big"))
+        h.update(chunk)
+    return h.hexdigest()
+
+
+class SemanticCache:
+    """Embedding-similarity index mapping near-duplicate inputs to cache keys."""
+
+    _encoder = None
+
+    def __init__(
+        self,
+        index_dir: Path,
+        namespace: str,
+        threshold: float = SIMILARITY_THRESHOLD,
+    ):
+        """
+        Initialize the semantic index.
+        Args:
+            index_dir: Directory for the embedding and key sidecar files
+            namespace: Agent/model namespace the index belongs to
+            threshold: Minimum cosine similarity for a hit
+        """
+        self.enabled = faiss is not None
+        self.threshold = threshold
+        # Raw float32 rows, so each add appends instead of rewriting the matrix
+        self.embeddings_path = index_dir / f"{namespace}.f32"
+        self.keys_path = index_dir / f"{namespace}.jsonl"
+        self.keys: List[str] = []
+        self.index = None
+
+        if self.enabled:
+            index_dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    @classmethod
+    def _get_encoder(cls):
+        """Load the sentence encoder once per process."""
+        if cls._encoder is None:
+            cls._encoder = SentenceTransformer(EMBEDDING_MODEL)
+        return cls._encoder
+
+    def _load(self):
+        """Load persisted embeddings and their cache keys."""
+        if not (self.embeddings_path.exists() and self.keys_path.exists()):
+            self._reset()
+            return
+        embeddings = np.fromfile(self.embeddings_path, dtype="float32")
+        with open(self.keys_path, "r", encoding="utf-8") as f:
+            self.keys = [json.loads(line)["key"] for line in f if line.strip()]
+        if not self.keys:
+            return
+        if not embeddings.size or embeddings.size % len(self.keys):
+            logger.warning(f"Semantic index {self.embeddings_path} is out of sync")
+            self._reset()
+            return
+        embeddings = embeddings.reshape(len(self.keys), -1)
+        self.index = faiss.IndexFlatIP(embeddings.shape[1])
+        self.index.add(embeddings)
+
+    def _reset(self):
+        """Drop the persisted index so later appends start in sync."""
+        self.keys = []
+        self.embeddings_path.unlink(missing_ok=True)
+        self.keys_path.unlink(missing_ok=True)
+
+    def embed(self, text: str) -> Optional["np.ndarray"]:
+        """
+        Embed text as a single normalized vector.
+        Args:
+            text: Text to embed
+        Returns:
+            Optional[np.ndarray]: Embedding, or None if the tier is disabled
+        """
+        if not self.enabled:
+            return None
+        text = " ".join(text.split())
+        chunks = [
+            text[i : i + EMBEDDING_CHUNK_CHARS]
+            for i in range(0, len(text), EMBEDDING_CHUNK_CHARS)
+        ] or [""]
+        vectors = self._get_encoder().encode(chunks, normalize_embeddings=True)
+        embedding = np.ascontiguousarray(
+            vectors.mean(axis=0, keepdims=True), dtype="float32"
+        )
+        faiss.normalize_L2(embedding)
+        return embedding
+
+    def lookup(self, embedding: Optional["np.ndarray"]) -> Optional[str]:
+        """
+        Find the cache key of the most similar stored input.
+        Args:
+            embedding: Query embedding
+        Returns:
+            Optional[str]: Cache key if similarity meets the threshold
+        """
+        if embedding is None or self.index is None:
+            return None
+        scores, ids = self.index.search(embedding, 1)
+        if ids[0][0] >= 0 and scores[0][0] >= self.threshold:
+            return self.keys[ids[0][0]]
+        return None
+
+    def add(self, embedding: Optional["np.ndarray"], key: str):
+        """
+        Add an embedding for a cached result.
+        Args:
+            embedding: Embedding of the input
+            key: Cache key of the result
+        """
+        if embedding is None:
+            return
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(embedding.shape[1])
+        self.index.add(embedding)
+        self.keys.append(key)
+
+        with open(self.embeddings_path, "ab") as f:
+            f.write(embedding.tobytes())
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key}) + "\n")
+
+
+class LLMCache:
+    """Content-addressable cache of parsed LLM results stored as JSON files."""
+
+    def __init__(self, cache_dir: str = LLM_CACHE_DIR):
+        """
+        Initialize the cache.
+        Args:
+            cache_dir: Directory for cached results
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._semantic: Dict[str, SemanticCache] = {}
+
+    def _path(self, key: str) -> Path:
+        """Get the file path for a cache key."""
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached result.
+        Args:
+            key: Cache key
+        Returns:
+            Optional[Dict]: Cached result if found
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                return json_loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {key}: {str(e)}")
+            self.delete(key)
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """
+        Store a result in the cache.
+        Args:
+            key: Cache key
+            value: JSON-serializable result
+        """
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        # Write to a temp file first so readers never see a partial entry
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(json_dumps(value))
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str):
+        """Remove a cached result."""
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def semantic(self, namespace: str) -> SemanticCache:
+        """Get the semantic index for an agent/model namespace."""
+        if namespace not in self._semantic:
+            self._semantic[namespace] = SemanticCache(
+                self.cache_dir / "semantic", namespace
+            )
+        return self._semantic[namespace]
@@ -1,8 +1,11 @@
+import asyncio
+import functools
 import os
 from typing import Optional
 
 import redis
 from dotenv import load_dotenv
+from redis import asyncio as redis_async
 from rq import Queue
 
 load_dotenv()
@@ -12,6 +15,7 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 64))
 
 # Create Redis connection pool
 redis_pool = redis.ConnectionPool(
@@ -22,12 +26,34 @@ redis_pool = redis.ConnectionPool(
     decode_responses=True,
 )
 
+# Non-blocking pool for agents running on the asyncio event loop; callers
+# wait for a free socket instead of failing once the cap is reached
+async_redis_pool = redis_async.BlockingConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    password=REDIS_PASSWORD,
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS,
+)
+
+# Client shared by every agent; created on first use
+_async_redis_client: Optional[redis_async.Redis] = None
+
 
 def get_redis_connection() -> redis.Redis:
     """Get a Redis connection from the pool."""
     return redis.Redis(connection_pool=redis_pool)
 
 
+def get_async_redis_connection() -> redis_async.Redis:
+    """Get the shared asyncio Redis client backed by the bounded pool."""
+    global _async_redis_client
+    if _async_redis_client is None:
+        _async_redis_client = redis_async.Redis(connection_pool=async_redis_pool)
+    return _async_redis_client
+
+
 def get_queue(queue_name: str = "default") -> Queue:
     """Get a Redis Queue instance."""
     return Queue(queue_name, connection=get_redis_connection())
@@ -72,3 +98,27 @@ def retry_operation(func, max_retries: int = 3, retry_delay: int = 1):
                 time.sleep(retry_delay)
 
     return wrapper
+
+
+def async_retry_operation(func, max_retries: int = 3, retry_delay: int = 1):
+    """
+    Decorator for retrying asyncio Redis operations.
+    Args:
+        func: Coroutine function to retry
+        max_retries: Maximum number of retry attempts
+        retry_delay: Delay between retries in seconds
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        attempts = 0
+        while attempts < max_retries:
+            try:
+                return await func(*args, **kwargs)
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                attempts += 1
+                if attempts == max_retries:
+                    raise e
+                await asyncio.sleep(retry_delay)
+
+    return wrapper
@@ -7,7 +7,8 @@ from ..database.redis_config import (get_queue, get_redis_connection,
                                      retry_operation)
 from ..schemas.message_schemas import (AgentResponse, AgentTask, BaseMessage,
                                        ContentGenerationRequest,
-                                       ContentGenerationResponse)
+                                       ContentGenerationResponse,
+                                       DeadLetterMessage)
 
 
 class QueueManager:
@@ -18,6 +19,7 @@ class QueueManager:
         "agent_task": AgentTask,
         "response": ContentGenerationResponse,
         "agent_response": AgentResponse,
+        "dead_letter": DeadLetterMessage,
     }
 
     def __init__(self):
@@ -47,12 +49,13 @@ class QueueManager:
                 f"Message must be of type {self.QUEUE_TYPES[queue_type].__name__}"
             )
 
-        # Store message metadata
+        # Store message metadata; pydantic serializes straight to JSON. The
+        # job still takes the message as a dict, which rq pickles itself
         message_data = message.model_dump()
         self.redis.hset(
             f"message:{message.message_id}",
             mapping={
-                "data": json.dumps(message_data),
+                "data": message.model_dump_json(),
                 "queue_type": queue_type,
                 "status": "pending",
                 "enqueued_at": datetime.utcnow().isoformat(),
@@ -107,7 +110,7 @@ class QueueManager:
         if error:
             update_data["error"] = error
 
-        self.redis.hmset(message_key, update_data)
+        self.redis.hset(message_key, mapping=update_data)
         return True
 
     def get_queue_stats(self) -> dict[str, dict[str, int]]:
@@ -0,0 +1,63 @@
+from typing import Dict, List
+
+from pydantic import BaseModel, Field
+
+
+class AnalysisSchema(BaseModel):
+    """Structured output of the document analyzer agent."""
+
+    topics: List[str]
+    subtopics: Dict[str, List[str]] = Field(default_factory=dict)
+    key_concepts: List[str]
+    complexity: str
+    suggested_structure: str
+    prerequisites: List[str] = Field(default_factory=list)
+    dependencies: List[str] = Field(default_factory=list)
+
+
+class PlanSection(BaseModel):
+    """A module section with its estimated duration."""
+
+    name: str
+    duration: float = 0.0  # in hours
+
+
+class PlanSchema(BaseModel):
+    """Structured output of the module planner agent."""
+
+    sections: List[PlanSection]
+    prerequisites: List[str]
+    learning_path: List[str]
+
+
+class ContentSchema(BaseModel):
+    """Structured output of the content generator agent."""
+
+    content: List[str]
+    examples: List[str]
+    visual_suggestions: List[str]
+    interactive_elements: List[str]
+
+
+class QuizItem(BaseModel):
+    """A quiz question with its answer, explanation and difficulty."""
+
+    question: str
+    answer: str = ""
+    explanation: str = ""
+    difficulty: float = 0.0
+
+
+class QuizSchema(BaseModel):
+    """Structured output of the quiz generator agent."""
+
+    items: List[QuizItem]
+
+
+class ReviewSchema(BaseModel):
+    """Structured output of the quality assurance agent."""
+
+    status: str  # "approved", "needs_revision" or "rejected"
+    feedback: List[str]
+    suggestions: List[str]
+    quality_score: float = Field(ge=0, le=100)
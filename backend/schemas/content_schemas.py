@@ -72,9 +72,11 @@ class VisualContent(GeneratedContent):
 
     title: str
     description: str
-    type: str  # diagram, chart, graph, etc.
+    # Named apart from the base type/style, which hold the ContentType and
+    # ContentStyle
+    visual_type: str  # diagram, chart, graph, etc.
     data: Dict[str, Any]
-    style: Dict[str, Any] = Field(default_factory=dict)
+    visual_style: Dict[str, Any] = Field(default_factory=dict)
 
 
 class InteractiveContent(GeneratedContent):
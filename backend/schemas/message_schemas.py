@@ -48,3 +48,10 @@ class AgentResponse(BaseMessage):
     task_id: UUID
     result: Dict[str, Any]
     error: Optional[str] = None
+
+
+class DeadLetterMessage(BaseMessage):
+    """Schema for tasks that could not be routed."""
+
+    task: AgentTask
+    error: str
@@ -0,0 +1,55 @@
+import json
+
+from backend.core import json_utils
+from backend.core.json_utils import canonical_json
+from backend.core.llm_cache import LLMCache, make_key
+
+
+def test_make_key_is_stable():
+    assert make_key("agent", {"a": 1, "b": 2}) == make_key("agent", {"b": 2, "a": 1})
+
+
+def test_make_key_keeps_parts_apart():
+    # Length prefixes stop the boundary between parts from shifting
+    assert make_key("ab", "c") != make_key("a", "bc")
+    assert make_key("a|b", "c") != make_key("a", "b|c")
+
+
+def test_make_key_depends_on_every_part():
+    base = make_key("agent:1", {"topic": "Ohm's law"})
+    assert make_key("agent:2", {"topic": "Ohm's law"}) != base
+    assert make_key("agent:1", {"topic": "Ohm's law "}) != base
+
+
+def test_canonical_json_matches_without_orjson(monkeypatch):
+    data = {"title": "Élan Vital", "b": [1, 2], "a": None}
+    expected = json.dumps(
+        data, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+    assert canonical_json(data) == expected
+
+    # Keys must not change with the encoder that happens to be installed
+    monkeypatch.setattr(json_utils, "orjson", None)
+    assert canonical_json(data) == expected
+
+
+def test_llm_cache_round_trip(tmp_path):
+    cache = LLMCache(str(tmp_path))
+    key = make_key("agent", {"topic": "circuits"})
+    assert cache.get(key) is None
+
+    cache.put(key, {"analysis": {"topics": ["Ohm's law"]}})
+    assert cache.get(key) == {"analysis": {"topics": ["Ohm's law"]}}
+
+    cache.delete(key)
+    assert cache.get(key) is None
+
+
+def test_llm_cache_discards_unreadable_entries(tmp_path):
+    cache = LLMCache(str(tmp_path))
+    key = make_key("agent", "broken")
+    cache.put(key, {"ok": True})
+    cache._path(key).write_bytes(b"{not json")
+
+    assert cache.get(key) is None
+    assert not cache._path(key).exists()
@@ -0,0 +1,92 @@
+import random
+from collections import defaultdict
+from uuid import uuid4
+
+import pytest
+
+from backend.agents.module_planner import ModulePlannerAgent
+from backend.schemas.module_schemas import Module
+
+
+@pytest.fixture
+def agent():
+    agent = ModulePlannerAgent()
+    yield agent
+    # Never registered in Redis, so there is no state to mark shut down
+    agent._finalizer.detach()
+
+
+def make_module(title, prerequisites=()):
+    return Module(
+        title=title,
+        description=title,
+        level=1,
+        prerequisites=list(prerequisites),
+        total_duration=30,
+        difficulty_level="beginner",
+    )
+
+
+def recursive_path(modules):
+    """The recursive sort the iterative one replaces."""
+    graph = defaultdict(list)
+    for module in modules:
+        for prereq_id in module.prerequisites:
+            graph[prereq_id].append(module.module_id)
+
+    visited = set()
+    path = []
+
+    def visit(module_id):
+        if module_id in visited:
+            return
+        visited.add(module_id)
+        for next_id in graph[module_id]:
+            visit(next_id)
+        path.append(module_id)
+
+    for module in modules:
+        if not module.prerequisites:
+            visit(module.module_id)
+    for module in modules:
+        if module.module_id not in visited:
+            visit(module.module_id)
+    return path
+
+
+def test_path_matches_recursive_sort(agent):
+    rng = random.Random(0)
+    for _ in range(50):
+        modules = []
+        for i in range(rng.randint(1, 20)):
+            prerequisites = [
+                module.module_id for module in modules if rng.random() < 0.2
+            ]
+            # Prerequisites outside the plan are ignored
+            if rng.random() < 0.1:
+                prerequisites.append(uuid4())
+            modules.append(make_module(f"Module {i}", prerequisites))
+        rng.shuffle(modules)
+        assert agent._optimize_learning_path(modules) == recursive_path(modules)
+
+
+def test_path_covers_every_module_once(agent):
+    first = make_module("First")
+    second = make_module("Second", [first.module_id])
+    third = make_module("Third", [first.module_id, second.module_id])
+    modules = [third, second, first]
+
+    path = agent._optimize_learning_path(modules)
+
+    assert sorted(path) == sorted(module.module_id for module in modules)
+
+
+def test_long_prerequisite_chain(agent):
+    # Deeper than the default recursion limit
+    modules = [make_module("Module 0")]
+    for i in range(1, 5000):
+        modules.append(make_module(f"Module {i}", [modules[-1].module_id]))
+
+    path = agent._optimize_learning_path(modules)
+
+    assert path == [module.module_id for module in reversed(modules)]
@@ -0,0 +1,118 @@
+import json
+import logging
+from collections import defaultdict
+
+import pytest
+import redis
+
+from backend.core import base_agent
+from backend.core.base_agent import BaseAgent
+
+
+class FakePipeline:
+    """Pipeline that applies its RPUSHes to a FakeRedis on execute()."""
+
+    def __init__(self, client):
+        self.client = client
+        self.pushes = []
+
+    def rpush(self, key, value):
+        self.pushes.append((key, value))
+
+    def execute(self):
+        if self.client.failures:
+            self.client.failures -= 1
+            raise redis.ConnectionError("connection lost")
+        for key, value in self.pushes:
+            self.client.lists[key].append(value)
+        self.client.executions += 1
+
+
+class FakeRedis:
+    """Just enough of a Redis client for the outbox."""
+
+    def __init__(self, failures=0):
+        self.lists = defaultdict(list)
+        self.failures = failures
+        self.executions = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class OutboxAgent(BaseAgent):
+    """Agent with only the state the outbox needs."""
+
+    def __init__(self, redis_client):
+        self.config = type("Config", (), {"name": "sender"})()
+        self.redis_client = redis_client
+        self.logger = logging.getLogger("agent.sender")
+        self._outbox = None
+        self._outbox_task = None
+        self._undelivered = 0
+
+    async def process(self, input_data):
+        return input_data
+
+
+@pytest.mark.asyncio
+async def test_flush_outbox_delivers_queued_messages():
+    client = FakeRedis()
+    agent = OutboxAgent(client)
+
+    for i in range(3):
+        await agent.send_message("receiver", {"n": i})
+    await agent.flush_outbox()
+
+    inbox = client.lists["agent:receiver:inbox"]
+    # Message ids are msg:<target>:<sender>:<payload>
+    assert [json.loads(message.split(":", 3)[3]) for message in inbox] == [
+        {"n": 0},
+        {"n": 1},
+        {"n": 2},
+    ]
+    # Messages sent in quick succession share one pipeline
+    assert client.executions == 1
+    await agent.close()
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_and_stops_the_flush_task():
+    client = FakeRedis()
+    agent = OutboxAgent(client)
+
+    await agent.send_message("receiver", {"n": 1})
+    task = agent._outbox_task
+    await agent.close()
+
+    assert len(client.lists["agent:receiver:inbox"]) == 1
+    assert task.done()
+    assert agent._outbox_task is None
+    assert agent._outbox is None
+
+
+@pytest.mark.asyncio
+async def test_flush_outbox_retries_failed_pushes():
+    client = FakeRedis(failures=base_agent.OUTBOX_RETRIES)
+    agent = OutboxAgent(client)
+
+    await agent.send_message("receiver", {"n": 1})
+    await agent.flush_outbox()
+
+    assert len(client.lists["agent:receiver:inbox"]) == 1
+    await agent.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_outbox_reports_undelivered_messages():
+    client = FakeRedis(failures=base_agent.OUTBOX_RETRIES + 1)
+    agent = OutboxAgent(client)
+
+    await agent.send_message("receiver", {"n": 1})
+    with pytest.raises(redis.RedisError):
+        await agent.flush_outbox()
+
+    # The failure is reported once
+    await agent.flush_outbox()
+    assert not client.lists["agent:receiver:inbox"]
+    await agent.close()
@@ -0,0 +1,53 @@
+import pytest
+
+from backend.agents.quality_assurance import QualityAssuranceAgent
+from backend.schemas.quality_schemas import QualityLevel
+
+
+@pytest.fixture
+def agent():
+    agent = QualityAssuranceAgent()
+    yield agent
+    # Never registered in Redis, so there is no state to mark shut down
+    agent._finalizer.detach()
+
+
+def expected_level(thresholds, score):
+    """The threshold chain the level cutoffs replace."""
+    if score >= thresholds["excellent"]:
+        return QualityLevel.EXCELLENT
+    elif score >= thresholds["good"]:
+        return QualityLevel.GOOD
+    elif score >= thresholds["satisfactory"]:
+        return QualityLevel.SATISFACTORY
+    elif score >= thresholds["needs_improvement"]:
+        return QualityLevel.NEEDS_IMPROVEMENT
+    return QualityLevel.POOR
+
+
+def test_levels_match_threshold_chain(agent):
+    for metric, thresholds in agent.quality_thresholds.items():
+        scores = {i / 100 for i in range(101)}
+        for threshold in thresholds.values():
+            # Scores exactly on and either side of each threshold
+            scores.update({threshold, threshold - 1e-9, threshold + 1e-9})
+        for score in sorted(scores):
+            assert agent._determine_quality_level(metric, score) == expected_level(
+                thresholds, score
+            ), (metric, score)
+
+
+def test_unknown_metric_uses_overall_thresholds(agent):
+    overall = agent.quality_thresholds["overall"]
+    for score in (0.0, 0.2, 0.5, 0.6, 0.79, 0.8, 1.0):
+        assert agent._determine_quality_level("unknown", score) == expected_level(
+            overall, score
+        )
+
+
+def test_levels_when_thresholds_fall_with_level(agent):
+    # Complexity thresholds fall as the level rises, so any score meeting the
+    # lowest one is already excellent
+    assert agent._determine_quality_level("complexity", 0.1) == QualityLevel.POOR
+    assert agent._determine_quality_level("complexity", 0.2) == QualityLevel.EXCELLENT
+    assert agent._determine_quality_level("complexity", 0.9) == QualityLevel.EXCELLENT